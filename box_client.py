@@ -4,12 +4,69 @@ import os
 import tempfile
 import requests
 import json
+import uuid
+import threading
 from pathlib import Path
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Read downloads in 256 KiB chunks behind a 1 MiB file buffer, so large videos
+# need far fewer Python-level loop iterations and write calls
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+FILE_BUFFER_SIZE = 1024 * 1024
+
+# Shared HTTP session for Box API calls (created lazily)
+_session = None
+_session_lock = threading.Lock()
+
+def get_box_session():
+    """
+    Get the shared requests session for Box API calls.
+    
+    The session keeps connections to api.box.com alive between the download,
+    file info and metadata calls, and retries rate-limited or unavailable
+    responses with backoff.
+    
+    Returns:
+        requests.Session: The shared session
+    """
+    global _session
+    
+    if _session is not None:
+        return _session
+    
+    # Webhook threads can race here on a cold start; build only one session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(["GET", "PUT", "POST"]),
+                respect_retry_after_header=True,  # urllib3 default, kept explicit since Box sends Retry-After with its 429s
+                raise_on_status=False  # Hand the last response back so callers can inspect it
+            )
+            adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    
+    return _session
+
+def _reset_session_after_fork():
+    """Drop the parent's session and lock in a forked child so it opens its own connections."""
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
 def parse_token(access_token):
     """
     Parse and validate the Box Skills token.
@@ -21,42 +78,109 @@ def parse_token(access_token):
         str: The read access token
         
     Raises:
-        Exception: If no valid read token is found
+        ValueError: If no valid read token is found
     """
-    try:
+    # The webhook always passes the token object as a dict, so check that first
+    if isinstance(access_token, dict):
+        token_data = access_token
+    elif isinstance(access_token, str) and (access_token[:1] == '{' or access_token.lstrip()[:1] == '{'):
         # If it's a string that looks like JSON, parse it
-        if isinstance(access_token, str) and access_token.strip().startswith('{'):
-            try:
-                token_data = json.loads(access_token)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, treat it as a raw token
-                return access_token
-        elif isinstance(access_token, dict):
-            token_data = access_token
-        else:
-            # If it's a plain string, assume it's the token
+        try:
+            token_data = json.loads(access_token)
+        except json.JSONDecodeError:
+            # If JSON parsing fails, treat it as a raw token
             return access_token
+    else:
+        # If it's a plain string, assume it's the token
+        return access_token
+        
+    # Extract the read token with proper scope
+    if 'read' in token_data:
+        read_token = token_data['read'].get('access_token')
+        if read_token:
+            # Log token details for debugging
+            logger.info("Found read token with scopes:")
+            if 'restricted_to' in token_data['read']:
+                scopes = token_data['read']['restricted_to']
+                logger.info("Token scopes: %s", scopes)
+            return read_token
             
-        # Extract the read token with proper scope
-        if 'read' in token_data:
-            read_token = token_data['read'].get('access_token')
-            if read_token:
-                # Log token details for debugging
-                logger.info("Found read token with scopes:")
-                if 'restricted_to' in token_data['read']:
-                    scopes = token_data['read']['restricted_to']
-                    logger.info(f"Token scopes: {scopes}")
-                return read_token
-                
-        # If we can't find a read token in the expected structure,
-        # look for any access_token field
-        if 'access_token' in token_data:
-            return token_data['access_token']
-            
-        raise Exception("No valid read token found in the access token data")
+    # If we can't find a read token in the expected structure,
+    # look for any access_token field
+    if 'access_token' in token_data:
+        return token_data['access_token']
         
-    except Exception as e:
-        raise Exception(f"Failed to parse access token: {str(e)}")
+    raise ValueError("No valid read token found in the access token data")
+
+def parse_write_token(access_token):
+    """
+    Get the token to use for writing Skills cards back to Box.
+    
+    Prefers the write token and falls back to the read token.
+    
+    Args:
+        access_token (str or dict): The access token or token object from the webhook
+        
+    Returns:
+        str: The write access token
+        
+    Raises:
+        ValueError: If the token object has neither a write nor a read token
+    """
+    if not isinstance(access_token, dict):
+        return str(access_token)
+    
+    for scope in ('write', 'read'):
+        token = access_token.get(scope, {}).get('access_token')
+        if token:
+            if scope == 'read':
+                logger.info("⚠️  Using read token as fallback")
+            return token
+    
+    logger.error("❌ Invalid token structure: no write or read access token")
+    raise ValueError("Invalid token structure provided")
+
+def _save_response(response, temp_file):
+    """
+    Stream a download response to temp_file.
+    
+    Data goes to a .part file that is renamed into place only once complete,
+    so a failed download never leaves a truncated file at temp_file. When the
+    size is known it is reserved up front, letting the filesystem allocate the
+    file in one go rather than growing it chunk by chunk.
+    
+    Args:
+        response (requests.Response): A streamed, successful response
+        temp_file (str): Destination path
+        
+    Returns:
+        int: Number of bytes written
+    """
+    part_file = temp_file + '.part'
+    size = int(response.headers.get('Content-Length') or 0)
+    written = 0
+    
+    try:
+        fd = os.open(part_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'wb', buffering=FILE_BUFFER_SIZE) as f:
+            if size > 0 and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except OSError:
+                    # Not supported by every filesystem; writing still works
+                    pass
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+            # Drop any reserved space the body didn't fill
+            f.truncate(written)
+        os.replace(part_file, temp_file)
+    except BaseException:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+        raise
+    
+    return written
 
 def download_file_from_box(file_id, access_token):
     """
@@ -87,63 +211,67 @@ def download_file_from_box(file_id, access_token):
         # For Box Skills, we use the content endpoint
         download_url = f'https://api.box.com/2.0/files/{file_id}/content'
         
+        session = get_box_session()
+        
         # Create a temporary file
         temp_dir = tempfile.gettempdir()
-        temp_file = os.path.join(temp_dir, f'box_file_{file_id}')
+        # Unique per call, so concurrent webhooks for the same file don't collide
+        temp_file = os.path.join(temp_dir, f'box_file_{file_id}_{uuid.uuid4().hex}')
         
-        # Download the file in chunks
-        with requests.get(download_url, headers=headers, stream=True) as r:
-            # Log response details for debugging
-            logger.info(f"Download request URL: {download_url}")
-            logger.info(f"Download request headers: {headers}")
-            
-            if r.status_code == 401 or r.status_code == 403:
-                logger.error(f"Authentication error: {r.status_code}")
-                logger.error(f"Response headers: {r.headers}")
-                logger.error(f"Response body: {r.text}")
+        try:
+            # Download the file in chunks
+            with session.get(download_url, headers=headers, stream=True) as r:
+                # Log response details for debugging
+                logger.info("Download request URL: %s", download_url)
+                logger.debug("Download request headers: %s", list(headers))
                 
-                # Try the download_url method as fallback for 403 errors  
-                if r.status_code == 403:
-                    logger.info("Trying download_url approach as fallback...")
-                    try:
-                        # First get file info to get the download URL
-                        info_url = f'https://api.box.com/2.0/files/{file_id}?fields=download_url'
-                        info_response = requests.get(info_url, headers=headers)
-                        
-                        if info_response.status_code == 200:
-                            file_info = info_response.json()
-                            if 'download_url' in file_info:
-                                download_url = file_info['download_url']
-                                logger.info(f"Got download URL: {download_url}")
-                                
-                                # Try downloading with the direct download URL
-                                with requests.get(download_url, headers=headers, stream=True) as download_r:
-                                    download_r.raise_for_status()
-                                    with open(temp_file, 'wb') as f:
-                                        for chunk in download_r.iter_content(chunk_size=8192):
-                                            f.write(chunk)
+                if r.status_code == 401 or r.status_code == 403:
+                    logger.error("Authentication error: %s", r.status_code)
+                    logger.error("Response headers: %s", r.headers)
+                    logger.error("Response body: %s", r.text)
+                    
+                    # Try the download_url method as fallback for 403 errors  
+                    if r.status_code == 403:
+                        logger.info("Trying download_url approach as fallback...")
+                        try:
+                            # First get file info to get the download URL
+                            info_url = f'https://api.box.com/2.0/files/{file_id}?fields=download_url'
+                            info_response = session.get(info_url, headers=headers)
+                            
+                            if info_response.status_code == 200:
+                                file_info = info_response.json()
+                                if 'download_url' in file_info:
+                                    download_url = file_info['download_url']
+                                    logger.info("Got download URL: %s", download_url)
                                     
-                                    # Check if download succeeded
-                                    if os.path.exists(temp_file) and os.path.getsize(temp_file) > 0:
-                                        logger.info(f"Successfully downloaded file using download_url method")
-                                        return temp_file
-                    except Exception as fallback_error:
-                        logger.error(f"Download URL fallback also failed: {fallback_error}")
-                
-                raise Exception(f"Authentication failed with status {r.status_code}")
-                
-            r.raise_for_status()
+                                    # Try downloading with the direct download URL
+                                    with session.get(download_url, headers=headers, stream=True) as download_r:
+                                        download_r.raise_for_status()
+                                        written = _save_response(download_r, temp_file)
+                                        
+                                        # Check if download succeeded
+                                        if written > 0:
+                                            logger.info("Successfully downloaded file using download_url method")
+                                            return temp_file
+                        except Exception as fallback_error:
+                            logger.error("Download URL fallback also failed: %s", fallback_error)
+                    
+                    raise Exception(f"Authentication failed with status {r.status_code}")
+                    
+                r.raise_for_status()
+                written = _save_response(r, temp_file)
             
-            with open(temp_file, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
-        # Verify the file was downloaded
-        if not os.path.exists(temp_file) or os.path.getsize(temp_file) == 0:
-            raise Exception("Downloaded file is empty or does not exist")
-            
-        logger.info(f"Successfully downloaded file to {temp_file}")
-        return temp_file
+            # Verify the file was downloaded, from the byte count rather than a stat
+            if written == 0:
+                raise Exception("Downloaded file is empty or does not exist")
+                
+            logger.info("Successfully downloaded file to %s", temp_file)
+            return temp_file
+        except BaseException:
+            # Don't leave an empty or partial download behind on any failure path
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
         
     except requests.exceptions.RequestException as e:
         error_msg = f"Failed to download file from Box: {str(e)}"
@@ -1,140 +1,490 @@
 # Placeholder for GPT keyword extraction logic
 
 import os
+import json
 import time
+import hashlib
+import re
+import textwrap
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 from openai import OpenAI
 from dotenv import load_dotenv
 
+# Load environment variables once at import time
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Models used for summary and keyword extraction; short transcripts go to the
+# cheaper, faster model and anything at or above the threshold to the larger one
+SHORT_MODEL = "gpt-4o-mini"
+LONG_MODEL = "gpt-4o"
+MODEL_THRESHOLD = int(os.getenv('GPT_MODEL_THRESHOLD', '4000'))
+
+# Shared client, created on first use so the connection pool stays warm
+_client = None
+_client_lock = threading.Lock()
+
+# Retries for rate limits, timeouts and 5xx responses; the SDK backs off
+# exponentially and honors Retry-After between attempts
+MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '5'))
+
+# Maximum number of concurrent requests issued by the batch helpers
+BATCH_CONCURRENCY = 10
+
+# In-process cache of (summary, keywords) results keyed by content hash
+CACHE_MAXSIZE = 1024
+_cache = OrderedDict()
+_cache_lock = threading.Lock()  # webhooks run on several gunicorn threads
+
+# Transcripts longer than this many characters are summarized chunk by chunk
+CHUNK_CHARS = int(os.getenv('GPT_CHUNK_CHARS', '8000'))
+
+# Output budget for one answer: ~200 tokens of summary plus ~120 of keywords.
+# An answer cut off at the budget is invalid JSON, so it is retried once with
+# RETRY_MAX_TOKENS (non-English summaries take more tokens)
+MAX_TOKENS = int(os.getenv('GPT_MAX_TOKENS', '320'))
+RETRY_MAX_TOKENS = MAX_TOKENS * 4
+
+# Fixed prompt text, built once; the transcript is appended to the user prompt
+_SYSTEM_MESSAGE = {"role": "system", "content": "You are a professional summarization and keyword extraction expert. Respond only with a JSON object containing a 'summary' string and a 'keywords' list of strings, without explanations or additional text."}
+
+_PROMPT = """Please analyze this transcript and return a JSON object with two fields:
+- "summary": a concise 2-4 sentence summary. Focus on the main points and key information. Keep it clear and professional.
+- "keywords": a list of the 5-10 most relevant keywords or phrases. Focus on specific, meaningful terms and proper nouns.
+
+Transcript:
+"""
+
+_COMBINE_PROMPT = """These are summaries and keywords of consecutive sections of one transcript. Combine them and return a JSON object with two fields:
+- "summary": a concise 2-4 sentence summary of the whole transcript. Focus on the main points and key information. Keep it clear and professional.
+- "keywords": a list of the 5-10 most relevant keywords or phrases overall, without duplicates. Focus on specific, meaningful terms and proper nouns.
+
+Sections:
+"""
+
+# Separators and surrounding characters removed when cleaning keywords
+_KEYWORD_SPLIT = re.compile(r"[,\n;]+")
+_KEYWORD_STRIP = " -*\t\"'"
+
+# Matches a complete JSON string inside a partially streamed keywords list
+_PARTIAL_KEYWORD = re.compile(r'"((?:[^"\\]|\\.)*)"\s*[,\]]')
+
+# Optional directory for a cache that persists across runs (disabled when unset)
+CACHE_DIR = os.getenv('GPT_CACHE_DIR')
+
 def get_openai_client():
-    """Get an OpenAI client instance with the API key."""
-    # Load environment variables when needed
-    load_dotenv()
+    """
+    Get the shared OpenAI client instance with the API key.
+    
+    The client is built once and reused, so successive calls share a pooled
+    keep-alive connection to the OpenAI API instead of paying a new TCP+TLS
+    handshake each time.
+    """
+    global _client
+    
+    if _client is not None:
+        return _client
+    
+    # Webhook threads can race here on a cold start; build only one client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv('OPENAI_API_KEY')
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=100,
+                    keepalive_expiry=30.0
+                ),
+                timeout=60.0
+            )
+            _client = OpenAI(api_key=api_key, http_client=http_client, max_retries=MAX_RETRIES)
+    
+    return _client
+
+def _reset_client_after_fork():
+    """Drop the parent's client and lock in a forked child so it opens its own connections."""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def _pick_model(text):
+    """Choose the chat model for a transcript based on its length in characters."""
+    return SHORT_MODEL if len(text) < MODEL_THRESHOLD else LONG_MODEL
+
+def _final_model(text):
+    """The model that writes the final answer; chunked transcripts are combined on LONG_MODEL."""
+    return LONG_MODEL if len(text) > CHUNK_CHARS else _pick_model(text)
+
+def _cache_key(model, text):
+    """Hash the model and whitespace-normalized text into a cache key."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model}|{normalized}".encode('utf-8')).hexdigest()
+
+def _cache_get(key):
+    """Look up a cached (summary, keywords) pair in memory, then on disk."""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    
+    if CACHE_DIR:
+        path = os.path.join(CACHE_DIR, f"{key}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            value = (entry["summary"], entry["keywords"])
+            _cache_put(key, value, persist=False)
+            return value
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    return None
+
+def _cache_put(key, value, persist=True):
+    """Store a (summary, keywords) pair, evicting the least recently used entry."""
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAXSIZE:
+            _cache.popitem(last=False)
     
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    return OpenAI(api_key=api_key)
+    if persist and CACHE_DIR:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, f"{key}.json")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"summary": value[0], "keywords": value[1]}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk cache is best effort; the in-memory entry is still valid
+            pass
 
-def generate_summary(text):
+def _cached_result(key, text, start_time, model=None):
+    """Return a cache hit as (summary, keywords, processing_info), or None on a miss."""
+    value = _cache_get(key)
+    if value is None:
+        return None
+    
+    summary, keywords = value
+    processing_info = {
+        "service": "OpenAI GPT-4",
+        "model": model or _pick_model(text),
+        "processing_time": round(time.perf_counter() - start_time, 2),
+        "input_length": len(text),
+        "cached": True
+    }
+    return summary, list(keywords), processing_info
+
+def _split_text(text, size):
+    """Split text into chunks of at most size characters on whitespace boundaries."""
+    return textwrap.wrap(text, size, break_on_hyphens=False)
+
+def _build_request(text, model=None, combine=False):
+    """Build the chat completion arguments for the combined summary and keyword prompt."""
+    if combine:
+        # Reduce step: text holds per-section results of one long transcript
+        return _request_for(_COMBINE_PROMPT + text, model)
+    
+    return _request_for(_PROMPT + text, model or _pick_model(text))
+
+def _request_for(prompt, model):
+    """Wrap a user prompt in the chat completion arguments shared by every call."""
+    return {
+        "model": model,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            _SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,  # Lower temperature for more focused responses
+        "max_tokens": MAX_TOKENS
+    }
+
+def _complete(client, request, stream=False, on_delta=None):
     """
-    Generate a 2-4 sentence summary of the transcript using GPT-4.
+    Run a chat completion and return the answer text.
+    
+    When streaming, each content delta is passed to on_delta as it arrives so
+    callers can start work before the full answer has been generated. An
+    answer cut off at max_tokens is requested again, unstreamed, with
+    RETRY_MAX_TOKENS.
+    """
+    if not stream:
+        response = client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        finish_reason = response.choices[0].finish_reason
+    else:
+        parts = []
+        finish_reason = None
+        for chunk in client.chat.completions.create(stream=True, **request):
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            delta = choice.delta.content
+            if delta:
+                parts.append(delta)
+                if on_delta:
+                    on_delta(delta)
+        content = "".join(parts)
+    
+    if finish_reason == "length" and request["max_tokens"] < RETRY_MAX_TOKENS:
+        logger.warning("GPT answer hit the %d token limit, retrying with %d", request["max_tokens"], RETRY_MAX_TOKENS)
+        return _complete(client, {**request, "max_tokens": RETRY_MAX_TOKENS})
+    
+    return content
+
+def _clean_keywords(raw):
+    """
+    Normalize the model's keywords into a deduplicated list of non-empty strings.
+    
+    Accepts a list or a single string; a string is split on commas, semicolons
+    and newlines, and list bullets or quotes around each keyword are stripped.
+    """
+    if isinstance(raw, str):
+        raw = _KEYWORD_SPLIT.split(raw)
+    parts = (str(p).strip(_KEYWORD_STRIP) for p in raw)
+    return list(dict.fromkeys(p for p in parts if p))
+
+def _parse_response(content, text, processing_time, model=None):
+    """Split the JSON answer into (summary, keywords, processing_info)."""
+    # Parse the JSON answer and clean both fields
+    result = json.loads(content)
+    summary = str(result.get("summary", "")).strip()
+    keywords = _clean_keywords(result.get("keywords", []))
+    
+    # Create processing info
+    processing_info = {
+        "service": "OpenAI GPT-4",
+        "model": model or _pick_model(text),
+        "processing_time": round(processing_time, 2),
+        "input_length": len(text)
+    }
+    
+    return summary, keywords, processing_info
+
+def extract_summary_and_keywords(text, stream=False, on_delta=None):
+    """
+    Generate a summary and extract keywords from the transcript with GPT-4.
+    
+    The model answers with a JSON object holding both fields, so the pair
+    costs one round trip and one prompt ingestion. Transcripts longer than
+    CHUNK_CHARS are summarized per chunk in parallel first, then combined in
+    a final call.
     
     Args:
-        text (str): The transcript text to summarize
+        text (str): The transcript text to analyze
+        stream (bool): Stream the answer instead of waiting for the full response;
+            always on when on_delta is given
+        on_delta (callable): Optional callback receiving each streamed chunk of the raw JSON answer
         
     Returns:
-        tuple: (summary, processing_info)
-            - summary (str): A concise summary of the transcript
+        tuple: (summary, keywords, processing_info)
+            - summary (str): A concise 2-4 sentence summary of the transcript
+            - keywords (list): A list of 5-10 relevant keywords or phrases
             - processing_info (dict): Information about the processing
-                - service (str): Service used for summary generation
+                - service (str): Service used for summary and keyword extraction
                 - model (str): Model used
                 - processing_time (float): Time taken in seconds
                 - input_length (int): Length of input text
     """
-    try:
-        # Start timing
-        start_time = time.time()
-        
-        # Initialize client when needed
-        client = get_openai_client()
-        
-        # Create the prompt for GPT-4
-        prompt = f"""Please provide a concise 2-4 sentence summary of this transcript. 
-Focus on the main points and key information. Keep it clear and professional.
+    # Start timing
+    start_time = time.perf_counter()
+    
+    # Reuse an earlier result for the same transcript if we have one
+    model = _final_model(text)
+    key = _cache_key(model, text)
+    cached = _cached_result(key, text, start_time, model=model)
+    if cached is not None:
+        return cached
+    
+    # Initialize client when needed
+    client = get_openai_client()
+    
+    # Long transcripts are summarized per chunk in parallel, then combined
+    if len(text) > CHUNK_CHARS:
+        request = _build_request(_map_chunks(client, text), model=model, combine=True)
+    else:
+        request = _build_request(text, model=model)
+    
+    # Call GPT-4 API
+    # Streaming only pays off when someone consumes the chunks
+    content = _complete(client, request, stream=stream or on_delta is not None, on_delta=on_delta)
+    
+    # End timing
+    processing_time = time.perf_counter() - start_time
+    
+    summary, keywords, processing_info = _parse_response(content, text, processing_time, model=model)
+    _cache_put(key, (summary, list(keywords)))
+    
+    return summary, keywords, processing_info
 
-Transcript:
-{text}"""
-
-        # Call GPT-4 API
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": "You are a professional summarization expert. Create clear, concise summaries that capture the essential information in 2-4 sentences."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3  # Lower temperature for more focused responses
-        )
+def _extract_chunk(client, text, model):
+    """Run the combined summary and keyword call for one chunk on the shared sync client."""
+    start_time = time.perf_counter()
+    content = _complete(client, _build_request(text, model=model), stream=False)
+    processing_time = time.perf_counter() - start_time
+    
+    summary, keywords, processing_info = _parse_response(content, text, processing_time, model=model)
+    _cache_put(_cache_key(model, text), (summary, list(keywords)))
+    
+    return summary, keywords, processing_info
+
+def _map_chunks(client, text):
+    """
+    Summarize each chunk of a long transcript in parallel on the small model.
+    
+    Uses threads and the sync client rather than an event loop, so it is safe
+    to call from code that is already running one.
+    
+    Returns the per-chunk summaries and keywords as text for the combining call.
+    """
+    chunks = _split_text(text, CHUNK_CHARS)
+    start_time = time.perf_counter()
+    partials = [_cached_result(_cache_key(SHORT_MODEL, chunk), chunk, start_time, model=SHORT_MODEL) for chunk in chunks]
+    misses = [i for i, partial in enumerate(partials) if partial is None]
+    
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(misses))) as pool:
+            fresh = pool.map(lambda i: _extract_chunk(client, chunks[i], SHORT_MODEL), misses)
+            for i, partial in zip(misses, fresh):
+                partials[i] = partial
+    
+    sections = []
+    for i, (summary, keywords, _) in enumerate(partials, 1):
+        sections.append(f"Section {i} summary: {summary}\nSection {i} keywords: {', '.join(keywords)}")
+    return "\n\n".join(sections)
+
+def extract_summary_and_keywords_batch(texts):
+    """
+    Generate summaries and keywords for many transcripts concurrently.
+    
+    Up to BATCH_CONCURRENCY transcripts are processed at once on the shared
+    client, so a batch costs roughly one round trip instead of one per file.
+    Each goes through extract_summary_and_keywords(), so long transcripts are
+    chunked and results share cache entries with single calls.
+    
+    Args:
+        texts (list): The transcript texts to analyze
         
-        # End timing
-        end_time = time.time()
-        processing_time = end_time - start_time
+    Returns:
+        list: One (summary, keywords, processing_info) tuple per input text, in input order
+    """
+    if not texts:
+        return []
+    
+    # Threads rather than an event loop, so this works from async callers too
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(texts))) as pool:
+        return list(pool.map(extract_summary_and_keywords, texts))
+
+def generate_summary_batch(texts):
+    """
+    Generate summaries for many transcripts concurrently.
+    
+    Args:
+        texts (list): The transcript texts to summarize
         
-        # Extract and clean the summary
-        summary = response.choices[0].message.content.strip()
+    Returns:
+        list: One (summary, processing_info) tuple per input text, in input order
+    """
+    return [(summary, info) for summary, _, info in extract_summary_and_keywords_batch(texts)]
+
+def extract_keywords_batch(texts):
+    """
+    Extract keywords for many transcripts concurrently.
+    
+    Args:
+        texts (list): The transcript texts to analyze
         
-        # Create processing info
-        processing_info = {
-            "service": "OpenAI GPT-4",
-            "model": "gpt-4-turbo-preview",
-            "processing_time": round(processing_time, 2),
-            "input_length": len(text)
-        }
+    Returns:
+        list: One (keywords, processing_info) tuple per input text, in input order
+    """
+    return [(keywords, info) for _, keywords, info in extract_summary_and_keywords_batch(texts)]
+
+def generate_summary(text, stream=False):
+    """
+    Generate a 2-4 sentence summary of the transcript using GPT-4.
+    
+    Thin wrapper around extract_summary_and_keywords() kept for backwards
+    compatibility; prefer the combined call when both results are needed.
+    
+    Args:
+        text (str): The transcript text to summarize
+        stream (bool): Stream the answer instead of waiting for the full response
         
-        return summary, processing_info
-            
-    except Exception as e:
-        raise Exception(f"Failed to generate summary: {str(e)}")
+    Returns:
+        tuple: (summary, processing_info)
+    """
+    summary, _, processing_info = extract_summary_and_keywords(text, stream=stream)
+    return summary, processing_info
 
-def extract_keywords(text):
+def extract_keywords(text, stream=False, on_keyword=None):
     """
     Extract 5-10 relevant keywords or phrases from the transcript text using GPT-4.
     
+    Thin wrapper around extract_summary_and_keywords() kept for backwards
+    compatibility; prefer the combined call when both results are needed.
+    
     Args:
         text (str): The transcript text to analyze
+        stream (bool): Stream the answer instead of waiting for the full response;
+            always on when on_keyword is given
+        on_keyword (callable): Optional callback receiving each keyword as soon as it is complete
         
     Returns:
         tuple: (keywords, processing_info)
-            - keywords (list): A list of 5-10 relevant keywords or phrases
-            - processing_info (dict): Information about the processing
-                - service (str): Service used for keyword extraction
-                - model (str): Model used
-                - processing_time (float): Time taken in seconds
-                - input_length (int): Length of input text
     """
-    try:
-        # Start timing
-        start_time = time.time()
-        
-        # Initialize client when needed
-        client = get_openai_client()
-        
-        # Create the prompt for GPT-4
-        prompt = f"""Please analyze this transcript and extract 5-10 most relevant keywords or phrases. 
-Focus on specific, meaningful terms and proper nouns. Return only the keywords as a comma-separated list.
-
-Transcript:
-{text}"""
-
-        # Call GPT-4 API
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": "You are a keyword extraction specialist. Extract only the most relevant and specific keywords or phrases. Return them as a comma-separated list without explanations or additional text."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3  # Lower temperature for more focused responses
-        )
-        
-        # End timing
-        end_time = time.time()
-        processing_time = end_time - start_time
-        
-        # Extract and clean the keywords
-        keywords_text = response.choices[0].message.content.strip()
-        keywords = [k.strip() for k in keywords_text.split(',')]
-        
-        # Create processing info
-        processing_info = {
-            "service": "OpenAI GPT-4",
-            "model": "gpt-4-turbo-preview", 
-            "processing_time": round(processing_time, 2),
-            "input_length": len(text)
-        }
-        
+    if on_keyword is None:
+        _, keywords, processing_info = extract_summary_and_keywords(text, stream=stream)
         return keywords, processing_info
-            
-    except Exception as e:
-        raise Exception(f"Failed to extract keywords: {str(e)}")
+    
+    content = ""
+    parsed = 0
+    emitted = set()
+    
+    def emit(keyword):
+        # Same cleanup as _clean_keywords, so callbacks match the returned list
+        keyword = keyword.strip(_KEYWORD_STRIP)
+        if keyword and keyword not in emitted:
+            emitted.add(keyword)
+            on_keyword(keyword)
+    
+    def on_delta(delta):
+        # Flush every keyword string that has been closed in the partial JSON so far
+        nonlocal content, parsed
+        content += delta
+        start = content.find('"keywords"')
+        if start == -1:
+            return
+        start = content.find('[', start)
+        if start == -1:
+            return
+        end = content.find(']', start)
+        region = content[start:end + 1] if end != -1 else content[start:]
+        matches = _PARTIAL_KEYWORD.findall(region)
+        for raw in matches[parsed:]:
+            emit(json.loads(f'"{raw}"'))
+        parsed = len(matches)
+    
+    _, keywords, processing_info = extract_summary_and_keywords(text, stream=stream, on_delta=on_delta)
+    
+    # Cache hits and non-streamed answers arrive all at once
+    for keyword in keywords:
+        emit(keyword)
+    
+    return keywords, processing_info
 
 def test_keyword_extraction():
     """Test function for keyword extraction and summary generation"""
@@ -145,14 +495,12 @@ def test_keyword_extraction():
     baseball game, the radio broadcast. So that's about all I have for now. So this is my test audio clip."""
     
     try:
-        print("\n=== Testing Keyword Extraction ===")
-        keywords, processing_info = extract_keywords(test_text)
+        print("\n=== Testing Summary and Keyword Extraction ===")
+        summary, keywords, processing_info = extract_summary_and_keywords(test_text)
         print("\nExtracted Keywords:")
         for i, keyword in enumerate(keywords, 1):
             print(f"{i}. {keyword}")
             
-        print("\n=== Testing Summary Generation ===")
-        summary, processing_info = generate_summary(test_text)
         print("\nGenerated Summary:")
         print(summary)
         print("\nProcessing Info:")
@@ -1,13 +1,16 @@
 from flask import Flask, request, jsonify
 import logging
 import subprocess
-from box_client import download_file_from_box
-from whisper_client import transcribe_audio
-from gpt_keywords import extract_keywords, generate_summary
-from skills_formatter import format_metadata, create_error_card, create_summary_card, create_processing_info_card, create_all_cards
+import csv
+import math
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from box_client import download_file_from_box, get_box_session, parse_write_token
+from whisper_client import transcribe_audio, transcribe_chunks, warm_up
+from gpt_keywords import extract_summary_and_keywords
+from skills_formatter import format_metadata, create_error_card, create_summary_card, create_processing_info_card, create_all_cards, dumps_bytes, dumps_pretty, loads_json, new_invocation_id
 import os
-import json
-import requests
 
 # Configure logging with more detail
 logging.basicConfig(
@@ -18,10 +21,83 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Whisper rejects uploads over 25 MB; larger audio is split into pieces of
+# this many seconds and transcribed in parallel
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+AUDIO_CHUNK_SECONDS = int(os.environ.get("AUDIO_CHUNK_SECONDS", "600"))
+
+# Audio that is almost entirely silence (failed mic captures, accidental
+# recordings) gets an empty transcript without any Whisper or GPT calls;
+# set SKIP_SILENT_AUDIO=0 to always transcribe
+SKIP_SILENT_AUDIO = os.environ.get("SKIP_SILENT_AUDIO", "1") != "0"
+MIN_SPEECH_RATIO = 0.02
+# The check decodes about a tenth of the file, in windows spread evenly from
+# start to end: one per five minutes of audio, between 3 and 20 of them
+SILENCE_SAMPLE_SHARE = 0.1
+SILENCE_WINDOW_SPAN_SECONDS = 300
+SILENCE_MIN_WINDOWS = 3
+SILENCE_MAX_WINDOWS = 20
+SILENCE_MIN_WINDOW_SECONDS = 30
+_SILENCE_BYTES_PER_SECOND = 64000 // 8  # our converted MP3; only sizes in-memory windows
+SILENCE_CHECK_TIMEOUT = 30
+_SILENCE_FILTER = 'silencedetect=noise=-50dB:d=0.5'
+_SILENCE_START = re.compile(rb"silence_start: (-?[\d.]+)")
+_SILENCE_DURATION = re.compile(rb"silence_duration: ([\d.]+)")
+_PROGRESS_TIME = re.compile(rb"time=(\d+):(\d+):([\d.]+)")
+
+# Webhook jobs run here after the request has been acknowledged
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("PROCESSING_WORKERS", "4")))
+
+def _log_job_failure(future):
+    """Log an exception that escaped a background job; nothing else reads the Future."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Background processing job failed", exc_info=exc)
+
+def _write_skills_cards(session, base_url, token, metadata):
+    """
+    Write Skills cards to a file, creating or replacing its boxSkillsCards metadata.
+    
+    Tries POST first and falls back to a single JSON Patch replace of /cards
+    when the instance already exists, so the common case is one request and
+    no GET is needed to find out which call to make.
+    
+    Args:
+        session (requests.Session): The shared Box session
+        base_url (str): The file's boxSkillsCards metadata URL
+        token (str): The write access token
+        metadata (dict): The metadata to write, with a 'cards' list
+        
+    Returns:
+        requests.Response: The response from the final request
+    """
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json'
+    }
+    
+    logger.debug("📝 Creating Skills cards with POST")
+    response = session.post(base_url, headers=headers, data=dumps_bytes(metadata))
+    logger.debug("📊 POST Response Status: %s", response.status_code)
+    
+    if response.status_code == 409:
+        logger.debug("📝 Skills cards already exist, replacing them with PUT (JSON Patch)")
+        patch_operations = [{
+            "op": "replace",
+            "path": "/cards",
+            "value": metadata.get('cards', [])
+        }]
+        patch_headers = {**headers, 'Content-Type': 'application/json-patch+json'}
+        response = session.put(base_url, headers=patch_headers, data=dumps_bytes(patch_operations))
+        logger.debug("📊 PUT Response Status: %s", response.status_code)
+    
+    logger.debug("📊 Response Body: %s", response.text)
+    return response
+
 def upload_metadata_to_box(file_id, metadata, write_token):
     """
     Upload metadata back to Box using the Skills Write API.
-    First checks if Skills cards exist, then creates or updates accordingly.
+    Creates the Skills cards, or replaces them if the file already has some.
     
     Args:
         file_id (str): The Box file ID
@@ -29,164 +105,46 @@ def upload_metadata_to_box(file_id, metadata, write_token):
         write_token (str): The write token from the webhook
     """
     try:
-        logger.info("🚀 STARTING BOX SKILLS API UPLOAD")
-        logger.info("=" * 80)
+        logger.info("🚀 Uploading Skills cards for file %s", file_id)
         
         # Extract and validate the write token
-        if isinstance(write_token, dict):
-            if 'write' in write_token and 'access_token' in write_token['write']:
-                token = write_token['write']['access_token']
-                logger.info("✅ Using write token from dictionary")
-            elif 'read' in write_token and 'access_token' in write_token['read']:
-                token = write_token['read']['access_token']
-                logger.info("⚠️  Using read token as fallback")
-            else:
-                logger.error(f"❌ Invalid token structure: {write_token}")
-                raise ValueError("Invalid token structure provided")
-        else:
-            token = str(write_token)
-            logger.info("✅ Using token as string")
+        token = parse_write_token(write_token)
         
-        logger.info(f"🔑 Token prefix: {token[:20]}..." if token else "No token")
-        logger.info(f"📁 File ID: {file_id}")
-        
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        logger.info(f"📋 Request headers prepared: {list(headers.keys())}")
         
         base_url = f'https://api.box.com/2.0/files/{file_id}/metadata/global/boxSkillsCards'
-        logger.info(f"🌐 Using Box Skills API endpoint: {base_url}")
-        
-        # First, check if Skills cards already exist on the file
-        logger.info("🔍 STEP 1: Checking if Skills cards already exist")
-        logger.info("-" * 40)
-        
-        check_response = requests.get(
-            base_url,
-            headers=headers
-        )
-        
-        logger.info(f"📊 GET Response Status: {check_response.status_code}")
-        logger.info(f"📊 GET Response Headers: {dict(check_response.headers)}")
-        logger.info(f"📊 GET Response Body: {check_response.text}")
+        session = get_box_session()
         
-        if check_response.status_code == 200:
-            # Skills cards exist, use PUT to update with JSON Patch format
-            logger.info("📝 STEP 2: Skills cards exist, updating with PUT (JSON Patch)")
-            logger.info("-" * 40)
-            
-            # Get the existing cards to understand the current structure
-            existing_data = check_response.json()
-            existing_cards = existing_data.get('cards', [])
-            existing_count = len(existing_cards)
-            new_cards = metadata.get('cards', [])
-            new_count = len(new_cards)
-            
-            logger.info(f"📊 Existing cards: {existing_count}, New cards: {new_count}")
-            
-            # For updating, we need to use JSON Patch format
-            # Content-Type should be application/json-patch+json
-            patch_headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json-patch+json'
-            }
-            
-            # Build JSON Patch operations to handle card count differences
-            patch_operations = []
-            for i, card in enumerate(new_cards):
-                if i < existing_count:
-                    # Replace existing card
-                    patch_operations.append({
-                        "op": "replace",
-                        "path": f"/cards/{i}",
-                        "value": card
-                    })
-                else:
-                    # Add new card
-                    patch_operations.append({
-                        "op": "add", 
-                        "path": f"/cards/-",
-                        "value": card
-                    })
-            
-            # If we have fewer new cards than existing cards, remove extra ones
-            for i in range(new_count, existing_count):
-                patch_operations.append({
-                    "op": "remove",
-                    "path": f"/cards/{new_count}"  # Always remove at new_count position
-                })
-            
-            logger.info(f"📋 JSON Patch operations: {json.dumps(patch_operations, indent=2)}")
-            
-            response = requests.put(
-                base_url,
-                headers=patch_headers,
-                json=patch_operations
-            )
-            
-            logger.info(f"📊 PUT Response Status: {response.status_code}")
-            logger.info(f"📊 PUT Response Headers: {dict(response.headers)}")
-            logger.info(f"📊 PUT Response Body: {response.text}")
-            
-        elif check_response.status_code == 404:
-            # No Skills cards exist, use POST to create
-            logger.info("📝 STEP 2: No Skills cards exist, creating with POST")
-            logger.info("-" * 40)
-            
-            logger.info(f"📋 POST Payload: {json.dumps(metadata, indent=2)}")
-            
-            response = requests.post(
-                base_url,
-                headers=headers,
-                json=metadata
-            )
-            
-            logger.info(f"📊 POST Response Status: {response.status_code}")
-            logger.info(f"📊 POST Response Headers: {dict(response.headers)}")
-            logger.info(f"📊 POST Response Body: {response.text}")
-            
-        else:
-            # Unexpected response from check
-            logger.error(f"❌ Unexpected response from Skills cards check: {check_response.status_code}")
-            logger.error(f"❌ Response body: {check_response.text}")
-            raise ValueError(f"Unexpected response: {check_response.status_code}")
-        
-        logger.info("=" * 80)
+        # Create the cards with POST, which succeeds for any newly uploaded file;
+        # only when Box reports they already exist (409) replace them with PUT
+        response = _write_skills_cards(session, base_url, token, metadata)
         
         # Check if the upload was successful
         if response.status_code in [200, 201]:
-            logger.info(f"✅ SUCCESS: Metadata uploaded successfully (Status: {response.status_code})")
+            logger.info("✅ Metadata uploaded successfully (Status: %s)", response.status_code)
             return True
         else:
             error_msg = f"Failed to upload metadata: {response.text}"
-            logger.error(f"❌ FAILED: {error_msg}")
+            logger.error("❌ FAILED: %s", error_msg)
             
             # Try to upload an error card as fallback
             try:
-                logger.info("🔄 Attempting to upload error card as fallback...")
-                error_card = create_error_card(f"Upload failed: {response.status_code}")
-                error_response = requests.post(
-                    base_url,
-                    headers=headers,
-                    json=error_card
-                )
-                logger.info(f"📊 Error card response: {error_response.status_code}")
+                logger.debug("🔄 Attempting to upload error card as fallback...")
+                # Keep the invocation ID of the cards that failed to upload
+                invocation_id = next((card.get('invocation', {}).get('id') for card in metadata.get('cards', [])), None)
+                error_card = create_error_card(f"Upload failed: {response.status_code}", invocation_id)
+                error_response = _write_skills_cards(session, base_url, token, error_card)
+                logger.debug("📊 Error card response: %s", error_response.status_code)
                 
                 if error_response.status_code not in [200, 201]:
-                    logger.error(f"Failed to upload error card: {error_response.text}")
+                    logger.error("Failed to upload error card: %s", error_response.text)
                     
             except Exception as fallback_error:
-                logger.error(f"Failed to upload error card: {fallback_error}")
+                logger.error("Failed to upload error card: %s", fallback_error)
             
             return False
             
     except Exception as e:
-        logger.error(f"❌ EXCEPTION in upload_metadata_to_box: {str(e)}")
-        logger.error(f"❌ Exception type: {type(e)}")
-        import traceback
-        logger.error(f"❌ Traceback: {traceback.format_exc()}")
+        logger.exception("❌ EXCEPTION in upload_metadata_to_box: %s", e)
         return False
 
 def upload_summary_card_to_box(file_id, summary_metadata, write_token):
@@ -200,23 +158,10 @@ def upload_summary_card_to_box(file_id, summary_metadata, write_token):
         write_token (str): The write token from the webhook
     """
     try:
-        logger.info("🚀 STARTING SUMMARY CARD UPLOAD")
-        logger.info("=" * 60)
+        logger.info("🚀 Uploading summary card for file %s", file_id)
         
         # Extract and validate the write token
-        if isinstance(write_token, dict):
-            if 'write' in write_token and 'access_token' in write_token['write']:
-                token = write_token['write']['access_token']
-                logger.info("✅ Using write token from dictionary")
-            elif 'read' in write_token and 'access_token' in write_token['read']:
-                token = write_token['read']['access_token']
-                logger.info("⚠️  Using read token as fallback")
-            else:
-                logger.error(f"❌ Invalid token structure: {write_token}")
-                raise ValueError("Invalid token structure provided")
-        else:
-            token = str(write_token)
-            logger.info("✅ Using token as string")
+        token = parse_write_token(write_token)
         
         headers = {
             'Authorization': f'Bearer {token}',
@@ -224,13 +169,13 @@ def upload_summary_card_to_box(file_id, summary_metadata, write_token):
         }
         
         base_url = f'https://api.box.com/2.0/files/{file_id}/metadata/global/boxSkillsCards'
-        logger.info(f"🌐 Using Box Skills API endpoint: {base_url}")
+        session = get_box_session()
         
         # For summary cards, we'll use a different approach:
         # Try to get existing cards and build a combined payload
-        logger.info("🔍 Getting existing cards to add summary alongside transcript")
+        logger.debug("🔍 Getting existing cards to add summary alongside transcript")
         
-        check_response = requests.get(base_url, headers=headers)
+        check_response = session.get(base_url, headers=headers)
         
         if check_response.status_code == 200:
             # Get existing cards and add our summary card
@@ -244,14 +189,12 @@ def upload_summary_card_to_box(file_id, summary_metadata, write_token):
                 "cards": combined_cards
             }
             
-            logger.info(f"📊 Combining {len(existing_cards)} existing cards + {len(summary_metadata.get('cards', []))} new cards")
-            logger.info(f"📋 Combined payload: {json.dumps(combined_metadata, indent=2)}")
+            logger.debug("📊 Combining %d existing cards + %d new cards", len(existing_cards), len(summary_metadata.get('cards', [])))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📋 Combined payload: %s", dumps_pretty(combined_metadata))
             
             # Use PUT to replace all cards with the combined set
-            patch_headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json-patch+json'
-            }
+            patch_headers = {**headers, 'Content-Type': 'application/json-patch+json'}
             
             # Create a single replace operation for all cards
             patch_operations = [{
@@ -260,29 +203,28 @@ def upload_summary_card_to_box(file_id, summary_metadata, write_token):
                 "value": combined_cards
             }]
             
-            response = requests.put(
+            response = session.put(
                 base_url,
                 headers=patch_headers,
-                json=patch_operations
+                data=dumps_bytes(patch_operations)
             )
         else:
             # No existing cards, just POST the summary
-            logger.info("📝 No existing cards found, posting summary card")
-            response = requests.post(base_url, headers=headers, json=summary_metadata)
+            logger.debug("📝 No existing cards found, posting summary card")
+            response = session.post(base_url, headers=headers, data=dumps_bytes(summary_metadata))
         
-        logger.info(f"📊 Response Status: {response.status_code}")
-        logger.info(f"📊 Response Body: {response.text}")
-        logger.info("=" * 60)
+        logger.debug("📊 Response Status: %s", response.status_code)
+        logger.debug("📊 Response Body: %s", response.text)
         
         if response.status_code in [200, 201]:
-            logger.info(f"✅ SUCCESS: Summary card uploaded successfully")
+            logger.info("✅ Summary card uploaded successfully")
             return True
         else:
-            logger.error(f"❌ FAILED: Summary card upload failed: {response.text}")
+            logger.error("❌ FAILED: Summary card upload failed: %s", response.text)
             return False
             
     except Exception as e:
-        logger.error(f"❌ EXCEPTION in upload_summary_card_to_box: {str(e)}")
+        logger.exception("❌ EXCEPTION in upload_summary_card_to_box: %s", e)
         return False
 
 @app.route("/", methods=["GET"])
@@ -290,8 +232,18 @@ def health_check():
     return jsonify({"status": "healthy"}), 200
 
 def convert_video_to_audio(video_path):
-    """Convert video to audio using ffmpeg."""
-    audio_path = video_path + '.mp3'
+    """
+    Convert video to audio using ffmpeg.
+    
+    ffmpeg writes the MP3 to its stdout, so the audio is handed to Whisper
+    from memory without an extra write and read of a temporary file.
+    
+    Args:
+        video_path (str): Path to the downloaded video
+        
+    Returns:
+        bytes: The MP3 audio
+    """
     try:
         # First, check if the input file exists
         if not os.path.exists(video_path):
@@ -301,58 +253,381 @@ def convert_video_to_audio(video_path):
         probe_cmd = ['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
         result = subprocess.run(probe_cmd, capture_output=True, text=True)
         
-        if not result.stdout.strip():
+        codecs = result.stdout.split()
+        if not codecs:
             raise Exception("No audio stream found in the input file")
         
-        # Convert to MP3 format (supported by Whisper API)
+        if codecs[0] == 'mp3':
+            # The audio track is already MP3, so copy it out without re-encoding
+            codec_args = ['-map', '0:a:0', '-acodec', 'copy']
+        else:
+            # Convert to MP3 format (supported by Whisper API). Whisper works on
+            # 16kHz mono internally, so anything more only adds encode and upload time
+            codec_args = [
+                '-acodec', 'libmp3lame',
+                '-ac', '1',  # Mono
+                '-ar', '16000',  # 16kHz sample rate
+                '-ab', '64k',  # 64kbps bitrate
+                '-threads', '0'
+            ]
+        
         cmd = [
             'ffmpeg',
             '-i', video_path,
             '-vn',  # No video
-            '-acodec', 'libmp3lame',
-            '-ac', '2',  # Stereo
-            '-ar', '44100',  # 44.1kHz sample rate
-            '-ab', '192k',  # 192kbps bitrate
-            '-y',  # Overwrite output file
-            audio_path
+            *codec_args,
+            '-f', 'mp3',
+            'pipe:1'  # Write to stdout
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, capture_output=True)
         if result.returncode != 0:
-            raise Exception(f"ffmpeg conversion failed: {result.stderr}")
+            raise Exception(f"ffmpeg conversion failed: {result.stderr.decode('utf-8', errors='replace')}")
             
-        # Verify the output file exists and has size > 0
-        if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
+        # Verify ffmpeg produced some audio
+        if not result.stdout:
             raise Exception("Failed to create valid audio file")
             
-        logger.info(f"Successfully converted video to audio: {audio_path}")
-        return audio_path
+        logger.info("Successfully converted video to audio: %d bytes", len(result.stdout))
+        return result.stdout
         
     except subprocess.CalledProcessError as e:
-        logger.error(f"Failed to convert video to audio: {str(e)}")
-        logger.error(f"ffmpeg stderr: {e.stderr}")
+        logger.error("Failed to convert video to audio: %s", e)
+        logger.error("ffmpeg stderr: %s", e.stderr)
         raise Exception(f"Failed to convert video to audio: {str(e)}")
     except Exception as e:
-        logger.error(f"Error during video conversion: {str(e)}")
+        logger.error("Error during video conversion: %s", e)
         raise
 
+def process_file(file_id, token, file_name):
+    """
+    Download, transcribe and analyze a file, then upload its Skills cards.
+    
+    Runs on the background executor so the webhook can answer Box right away.
+    Failures are reported to the user as an error card on the file.
+    
+    Args:
+        file_id (str): The Box file ID
+        token (dict): The token object from the webhook
+        file_name (str): The lower-cased file name
+        
+    Returns:
+        bool: True if the cards were uploaded successfully
+    """
+    # One invocation ID for every card this job writes, error cards included
+    invocation_id = new_invocation_id()
+    
+    # Download and process the video
+    try:
+        video_path = download_file_from_box(file_id, token)
+        logger.info("Successfully downloaded file to %s", video_path)
+    except Exception as e:
+        error_msg = f"Failed to download file: {str(e)}"
+        logger.error(error_msg)
+        # Create and upload error card
+        error_metadata = create_error_card(error_msg, invocation_id)
+        try:
+            upload_metadata_to_box(file_id, error_metadata, token)
+            logger.info("Successfully uploaded error card to Box")
+        except Exception as upload_err:
+            logger.error("Failed to upload error card: %s", upload_err)
+        return False
+    
+    try:
+        # Convert to audio if needed
+        audio = video_path
+        supported_audio = ('.mp3', '.m4a', '.wav', '.flac', '.ogg', '.webm')
+        if not file_name.endswith(supported_audio):
+            audio = convert_video_to_audio(video_path)
+            logger.info("Successfully converted to audio")
+        
+        # Get transcript with timestamps
+        logger.info("Starting Whisper transcription")
+        audio_size = len(audio) if isinstance(audio, (bytes, bytearray)) else os.path.getsize(audio)
+        
+        ratio = speech_ratio(audio) if SKIP_SILENT_AUDIO else 1.0
+        if ratio < MIN_SPEECH_RATIO:
+            logger.warning("Audio for file %s is nearly silent (speech ratio %.3f), skipping transcription", file_id, ratio)
+            transcript_data = {
+                "text": "",
+                "segments": [],
+                "processing_info": {
+                    "service": "FFmpeg silence detection",
+                    "model": "skipped (no speech)",
+                    "processing_time": 0,
+                    "file_size": audio_size
+                }
+            }
+        elif audio_size > WHISPER_MAX_BYTES:
+            transcript_data = transcribe_chunks(split_audio(audio))
+        else:
+            # Connect to Whisper while the upload is hashed and read
+            warm_up()
+            transcript_data = transcribe_audio(audio)
+        logger.info("Whisper transcription completed. Segments: %d", len(transcript_data.get('segments', [])))
+        
+        # Generate summary and extract keywords with a single GPT-4 call
+        if transcript_data["text"].strip():
+            logger.debug("Starting summary and keyword extraction with GPT-4")
+            try:
+                summary, keywords, summary_info = extract_summary_and_keywords(transcript_data["text"])
+            except Exception:
+                # Still upload the transcript; only the summary and keyword cards are lost
+                logger.exception("Summary and keyword extraction failed for file %s", file_id)
+                summary, keywords, summary_info = "", [], None
+        else:
+            # Nothing to summarize
+            summary, keywords, summary_info = "", [], None
+        logger.info("Summary and keywords completed. Summary: %d characters, keywords: %d", len(summary) if summary else 0, len(keywords))
+        logger.debug("Keywords: %s", keywords)
+        logger.debug("Summary and keywords processing info: %s", summary_info)
+        
+        # Keywords come from the same call, so there is no separate timing to report
+        keywords_info = None
+        
+        # Extract processing info from transcript data
+        transcript_info = transcript_data.get("processing_info", {})
+        
+        # Whisper segments are time-ordered, so the last one ends the file
+        segments = transcript_data.get("segments")
+        file_duration = segments[-1].get("end", 0) if segments else 0
+        
+        # Format metadata for Box Skills
+        logger.debug("Formatting metadata for Box Skills")
+        metadata = format_metadata(transcript_data, keywords, summary, invocation_id)
+        
+        # EXTENSIVE LOGGING - Show exactly what we're about to send. Only at
+        # DEBUG: dumping the payload walks the whole transcript
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📤 METADATA PAYLOAD DETAILS")
+            logger.debug("📊 Metadata keys: %s", metadata.keys() if isinstance(metadata, dict) else 'Not a dict')
+            if isinstance(metadata, dict) and 'cards' in metadata:
+                logger.debug("📊 Number of cards: %d", len(metadata['cards']))
+                for i, card in enumerate(metadata['cards']):
+                    logger.debug("📊 Card %d: type=%s, entries=%d", i + 1, card.get('skill_card_type'), len(card.get('entries', [])))
+            
+            # Log the full JSON payload
+            logger.debug("📋 FULL JSON PAYLOAD:\n%s", dumps_pretty(metadata))
+        
+        # Check if we got an error card
+        is_error_card = (
+            isinstance(metadata, dict) and
+            "cards" in metadata and
+            len(metadata["cards"]) == 1 and 
+            metadata["cards"][0].get("type") == "skill_card" and
+            metadata["cards"][0].get("skill_card_type") == "status" and
+            metadata["cards"][0].get("skill_card_title", {}).get("message") == "Processing Error"
+        )
+        
+        if is_error_card:
+            logger.warning("Generated error card due to metadata formatting issues")
+        else:
+            logger.debug("Successfully formatted metadata")
+        
+        # Create all cards together in the desired order: Summary, Keywords, Transcript, AI Details
+        logger.debug("🔄 Creating all cards in correct order: Summary → Keywords → Transcript → AI Details")
+        all_cards_metadata = create_all_cards(
+            transcript_data=transcript_data,
+            summary=summary,
+            keywords=keywords,
+            transcript_info=transcript_info,
+            summary_info=summary_info,
+            keywords_info=keywords_info,
+            file_duration=file_duration,
+            invocation_id=invocation_id
+        )
+        
+        logger.info("📊 Created %d cards in total", len(all_cards_metadata['cards']))
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, card in enumerate(all_cards_metadata['cards']):
+                card_type = card.get('skill_card_type')
+                card_title = card.get('skill_card_title', {}).get('message', 'Unknown')
+                logger.debug("   Card %d: %s - %s", i + 1, card_type, card_title)
+        
+        # Upload all cards together
+        logger.debug("🔄 Uploading all cards together to preserve order")
+        upload_success = upload_metadata_to_box(file_id, all_cards_metadata, token)
+        
+        if upload_success:
+            logger.info("✅ Successfully uploaded all cards to Box")
+        else:
+            logger.error("❌ Failed to upload cards")
+            raise Exception("Failed to upload cards")
+    
+    except Exception as e:
+        error_msg = f"Failed during processing: {str(e)}"
+        logger.error(error_msg)
+        # Create and upload error card
+        error_metadata = create_error_card(error_msg, invocation_id)
+        try:
+            upload_metadata_to_box(file_id, error_metadata, token)
+            logger.info("Successfully uploaded error card to Box")
+        except Exception as upload_err:
+            logger.error("Failed to upload error card: %s", upload_err)
+        return False
+    finally:
+        # Clean up the downloaded file; converted audio only lives in memory
+        if os.path.exists(video_path):
+            os.remove(video_path)
+    
+    return True
+
+def split_audio(audio, chunk_seconds=AUDIO_CHUNK_SECONDS):
+    """
+    Split audio into consecutive MP3 pieces small enough for Whisper.
+    
+    Pieces are encoded as 16kHz mono MP3, so a 10 minute piece is about 5 MB.
+    
+    Args:
+        audio (str or bytes): Path to the audio file, or MP3 bytes
+        chunk_seconds (int): Target length of each piece in seconds
+        
+    Returns:
+        list: (mp3 bytes, offset in seconds) pairs in recording order
+    """
+    in_memory = isinstance(audio, (bytes, bytearray))
+    
+    with tempfile.TemporaryDirectory() as chunk_dir:
+        list_path = os.path.join(chunk_dir, 'chunks.csv')
+        cmd = [
+            'ffmpeg',
+            '-i', 'pipe:0' if in_memory else audio,
+            '-vn',
+            '-acodec', 'libmp3lame',
+            '-ac', '1',
+            '-ar', '16000',
+            '-ab', '64k',
+            '-f', 'segment',
+            '-segment_time', str(chunk_seconds),
+            '-segment_list', list_path,
+            '-segment_list_type', 'csv',  # Records each piece's start time
+            os.path.join(chunk_dir, 'chunk%04d.mp3')
+        ]
+        
+        result = subprocess.run(cmd, input=audio if in_memory else None, capture_output=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg split failed: {result.stderr.decode('utf-8', errors='replace')}")
+        
+        chunks = []
+        with open(list_path, newline='') as f:
+            for name, start, _end in csv.reader(f):
+                with open(os.path.join(chunk_dir, name), 'rb') as chunk:
+                    chunks.append((chunk.read(), float(start)))
+    
+    logger.info("Split audio into %d pieces", len(chunks))
+    return chunks
+
+def _silence_windows(length, min_window):
+    """
+    Spread sampling windows evenly over audio of the given length.
+    
+    Works in seconds for files on disk and in bytes for in-memory MP3.
+    
+    Args:
+        length (float): Total length of the audio
+        min_window (float): Smallest window worth decoding, in the same unit
+        
+    Returns:
+        list: (offset, size) pairs, or None when the whole audio should be checked
+    """
+    span = SILENCE_WINDOW_SPAN_SECONDS * (min_window / SILENCE_MIN_WINDOW_SECONDS)
+    count = min(SILENCE_MAX_WINDOWS, max(SILENCE_MIN_WINDOWS, math.ceil(length / span)))
+    size = max(min_window, length * SILENCE_SAMPLE_SHARE / count)
+    if count * size >= length:
+        return None
+    step = (length - size) / (count - 1)
+    return [(i * step, size) for i in range(count)]
+
+def _audio_duration(path):
+    """Read the duration of an audio file from its header with ffprobe, or None if unknown."""
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', path]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=SILENCE_CHECK_TIMEOUT)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def speech_ratio(audio):
+    """
+    Estimate the fraction of the audio that is not silence.
+    
+    Runs ffmpeg's silencedetect filter over windows spread evenly across the
+    whole recording (about a tenth of it in total) instead of decoding every
+    second, so long silences at the start or end can't hide the speech in
+    between. The check only saves work, so it fails open: any ffmpeg error or
+    timeout returns 1.0 and the file is transcribed as usual.
+    
+    Args:
+        audio (str or bytes): Path to the audio file, or MP3 bytes
+        
+    Returns:
+        float: Share of the sampled duration above the silence threshold, 1.0 if unknown
+    """
+    try:
+        if isinstance(audio, (bytes, bytearray)):
+            windows = _silence_windows(len(audio), SILENCE_MIN_WINDOW_SECONDS * _SILENCE_BYTES_PER_SECOND)
+            if windows:
+                # MP3 decoders resync on the next frame header, so slices can be joined
+                audio = b"".join(audio[int(offset):int(offset + size)] for offset, size in windows)
+            stdin = bytes(audio)
+            cmd = ['ffmpeg', '-hide_banner', '-i', 'pipe:0', '-vn', '-af', _SILENCE_FILTER, '-f', 'null', '-']
+        else:
+            duration = _audio_duration(audio)
+            if duration is None:
+                return 1.0
+            windows = _silence_windows(duration, SILENCE_MIN_WINDOW_SECONDS) or [(0, duration)]
+            stdin = None
+            cmd = ['ffmpeg', '-hide_banner']
+            for offset, size in windows:
+                # Input seeking means only the windows are read and decoded
+                cmd += ['-ss', f'{offset:.3f}', '-t', f'{size:.3f}', '-i', audio]
+            inputs = ''.join(f'[{i}:a:0]' for i in range(len(windows)))
+            cmd += [
+                '-filter_complex', f'{inputs}concat=n={len(windows)}:v=0:a=1,{_SILENCE_FILTER}',
+                '-f', 'null',
+                '-'
+            ]
+        
+        result = subprocess.run(cmd, input=stdin, capture_output=True, timeout=SILENCE_CHECK_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("Silence check failed, transcribing anyway: %s", e)
+        return 1.0
+    if result.returncode != 0:
+        logger.warning("Silence check failed, transcribing anyway: %s", result.stderr[-500:].decode('utf-8', errors='replace'))
+        return 1.0
+    
+    # The last progress line holds the decoded duration
+    times = _PROGRESS_TIME.findall(result.stderr)
+    if not times:
+        return 1.0
+    hours, minutes, seconds = times[-1]
+    sampled = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    if sampled <= 0:
+        return 1.0
+    
+    starts = _SILENCE_START.findall(result.stderr)
+    durations = [float(d) for d in _SILENCE_DURATION.findall(result.stderr)]
+    silence = sum(durations)
+    if len(starts) > len(durations):
+        # Silence running to the end of the file may never be closed
+        silence += sampled - max(float(starts[-1]), 0.0)
+    
+    return max(0.0, 1.0 - silence / sampled)
+
 @app.route("/webhook", methods=["POST"])
 def webhook():
     try:
         logger.info("Received webhook request")
-        data = request.json
-        logger.info(f"Webhook payload: {json.dumps(data)}")
+        data = loads_json(request.get_data())
+        logger.debug("Webhook payload: %s", data)
         
         # Extract file ID and token from the request
         file_id = data.get("source", {}).get("id")
         token = data.get("token")
         file_name = data.get("source", {}).get("name", "").lower()
         
-        logger.info(f"File ID: {file_id}")
-        logger.info(f"File name: {file_name}")
-        logger.info(f"Token present: {bool(token)}")
-        logger.info(f"Token type: {type(token)}")
-        logger.info(f"Token structure: {json.dumps(token) if isinstance(token, dict) else 'not a dict'}")
+        logger.info("File ID: %s, file name: %s, token present: %s", file_id, file_name, bool(token))
+        logger.debug("Token type: %s", type(token))
         
         if not file_id:
             logger.error("Missing file ID")
@@ -364,143 +639,12 @@ def webhook():
             logger.error("Invalid token format")
             return jsonify({"error": "Invalid token format"}), 400
 
-        # Download and process the video
-        try:
-            video_path = download_file_from_box(file_id, token)
-            logger.info(f"Successfully downloaded file to {video_path}")
-        except Exception as e:
-            error_msg = f"Failed to download file: {str(e)}"
-            logger.error(error_msg)
-            # Create and upload error card
-            error_metadata = create_error_card(error_msg)
-            try:
-                upload_metadata_to_box(file_id, error_metadata, token)
-                logger.info("Successfully uploaded error card to Box")
-            except Exception as upload_err:
-                logger.error(f"Failed to upload error card: {str(upload_err)}")
-            return jsonify({"error": error_msg}), 500
-        
-        try:
-            # Convert to audio if needed
-            audio_path = video_path
-            supported_audio = ('.mp3', '.m4a', '.wav', '.flac', '.ogg', '.webm')
-            if not file_name.endswith(supported_audio):
-                audio_path = convert_video_to_audio(video_path)
-                logger.info(f"Successfully converted to audio: {audio_path}")
-            
-            # Get transcript with timestamps
-            transcript_data = transcribe_audio(audio_path)
-            logger.info("Successfully transcribed audio")
-            logger.info(f"Transcript data structure: {json.dumps(transcript_data)}")
-            
-            # Process with Whisper
-            logger.info("Starting Whisper transcription")
-            transcript_data = transcribe_audio(audio_path)
-            logger.info(f"Whisper transcription completed. Segments: {len(transcript_data.get('segments', []))}")
-            
-            # Extract keywords using GPT-4
-            logger.info("Starting keyword extraction with GPT-4")
-            keywords, keywords_info = extract_keywords(transcript_data["text"])
-            logger.info(f"Keyword extraction completed. Keywords: {len(keywords)}")
-            logger.info(f"Keywords: {keywords}")
-            logger.info(f"Keywords processing info: {keywords_info}")
-            
-            # Generate summary using GPT-4
-            logger.info("Starting summary generation with GPT-4")
-            summary, summary_info = generate_summary(transcript_data["text"])
-            logger.info(f"Summary generation completed. Length: {len(summary) if summary else 0} characters")
-            logger.info(f"Summary processing info: {summary_info}")
-            
-            # Extract processing info from transcript data
-            transcript_info = transcript_data.get("processing_info", {})
-            
-            # Calculate file duration from transcript segments
-            file_duration = 0
-            if transcript_data.get("segments"):
-                file_duration = max(segment.get("end", 0) for segment in transcript_data["segments"])
-            
-            # Format metadata for Box Skills
-            logger.info("Formatting metadata for Box Skills")
-            metadata = format_metadata(transcript_data, keywords, summary)
-            
-            # EXTENSIVE LOGGING - Show exactly what we're about to send
-            logger.info("=" * 60)
-            logger.info("📤 METADATA PAYLOAD DETAILS")
-            logger.info("=" * 60)
-            logger.info(f"📊 Metadata type: {type(metadata)}")
-            logger.info(f"📊 Metadata keys: {metadata.keys() if isinstance(metadata, dict) else 'Not a dict'}")
-            if isinstance(metadata, dict) and 'cards' in metadata:
-                logger.info(f"📊 Number of cards: {len(metadata['cards'])}")
-                for i, card in enumerate(metadata['cards']):
-                    logger.info(f"📊 Card {i+1}: type={card.get('skill_card_type')}, entries={len(card.get('entries', []))}")
-            
-            # Log the full JSON payload
-            metadata_json = json.dumps(metadata, indent=2)
-            logger.info(f"📋 FULL JSON PAYLOAD:\n{metadata_json}")
-            logger.info("=" * 60)
-            
-            # Check if we got an error card
-            is_error_card = (
-                isinstance(metadata, dict) and
-                "cards" in metadata and
-                len(metadata["cards"]) == 1 and 
-                metadata["cards"][0].get("type") == "skill_card" and
-                metadata["cards"][0].get("skill_card_type") == "status" and
-                metadata["cards"][0].get("skill_card_title", {}).get("message") == "Processing Error"
-            )
-            
-            if is_error_card:
-                logger.warning("Generated error card due to metadata formatting issues")
-            else:
-                logger.info("Successfully formatted metadata")
-            
-            # Create all cards together in the desired order: Summary, Keywords, Transcript, AI Details
-            logger.info("🔄 Creating all cards in correct order: Summary → Keywords → Transcript → AI Details")
-            all_cards_metadata = create_all_cards(
-                transcript_data=transcript_data,
-                summary=summary,
-                keywords=keywords,
-                transcript_info=transcript_info,
-                summary_info=summary_info,
-                keywords_info=keywords_info,
-                file_duration=file_duration
-            )
-            
-            logger.info(f"📊 Created {len(all_cards_metadata['cards'])} cards in total")
-            for i, card in enumerate(all_cards_metadata['cards']):
-                card_type = card.get('skill_card_type')
-                card_title = card.get('skill_card_title', {}).get('message', 'Unknown')
-                logger.info(f"   Card {i+1}: {card_type} - {card_title}")
-            
-            # Upload all cards together
-            logger.info("🔄 Uploading all cards together to preserve order")
-            upload_success = upload_metadata_to_box(file_id, all_cards_metadata, token)
-            
-            if upload_success:
-                logger.info("✅ Successfully uploaded all cards to Box")
-            else:
-                logger.error("❌ Failed to upload cards")
-                raise Exception("Failed to upload cards")
-            
-        except Exception as e:
-            error_msg = f"Failed during processing: {str(e)}"
-            logger.error(error_msg)
-            # Create and upload error card
-            error_metadata = create_error_card(error_msg)
-            try:
-                upload_metadata_to_box(file_id, error_metadata, token)
-                logger.info("Successfully uploaded error card to Box")
-            except Exception as upload_err:
-                logger.error(f"Failed to upload error card: {str(upload_err)}")
-            return jsonify({"error": error_msg}), 500
-        finally:
-            # Clean up temporary files
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            if os.path.exists(audio_path) and audio_path != video_path:
-                os.remove(audio_path)
-            
-        return jsonify({"message": "Processing completed successfully"})
+        # Process in the background and acknowledge the event right away, so Box
+        # doesn't time out and retry while the pipeline runs
+        job = _executor.submit(process_file, file_id, token, file_name)
+        job.add_done_callback(_log_job_failure)
+        logger.info("Queued file %s for processing", file_id)
+        return jsonify({"message": "Processing started"}), 202
             
     except Exception as e:
         error_msg = f"Webhook error: {str(e)}"
@@ -511,7 +655,7 @@ def webhook():
             upload_metadata_to_box(file_id, error_metadata, token)
             logger.info("Successfully uploaded error card to Box")
         except Exception as upload_err:
-            logger.error(f"Failed to upload error card: {str(upload_err)}")
+            logger.error("Failed to upload error card: %s", upload_err)
         return jsonify({"error": error_msg}), 500
 
 if __name__ == "__main__":
@@ -1,36 +1,206 @@
 # Placeholder for formatting Box Skills metadata
+import os
 import json
-import time
+import uuid
+import logging
+import functools
+import fastjsonschema
 
-def create_error_card(error_message):
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Validate format_metadata output before returning it. Set
+# SKILLS_VALIDATE_OUTGOING=0, or run under python -O, to skip the check
+VALIDATE_OUTGOING = os.environ.get("SKILLS_VALIDATE_OUTGOING", "1") != "0"
+
+def new_invocation_id():
+    """
+    Generate a unique skill invocation ID.
+    
+    A random suffix keeps cards from different requests distinct even when they
+    are built within the same second. Compute it once per request and pass it to
+    every card builder.
+    
+    Returns:
+        str: The invocation ID
+    """
+    return f"box-video-skill-{uuid.uuid4().hex[:12]}"
+
+def dumps_pretty(obj):
+    """
+    Serialize an object to an indented JSON string for logging and debugging.
+    
+    Uses orjson when it is installed, which is several times faster than the
+    stdlib encoder on large transcript payloads.
+    
+    Args:
+        obj: The JSON-serializable object
+        
+    Returns:
+        str: The indented JSON text
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, indent=2)
+
+def dumps_bytes(obj):
+    """
+    Serialize an object to compact UTF-8 JSON bytes for an HTTP request body.
+    
+    Uses orjson when it is installed, so the payload is encoded straight to
+    bytes without an intermediate str.
+    
+    Args:
+        obj: The JSON-serializable object
+        
+    Returns:
+        bytes: The encoded JSON document
+    """
+    try:
+        return _encode(obj)
+    except (TypeError, UnicodeEncodeError):
+        # Lone surrogates are the only text UTF-8 can't encode; they are rare,
+        # so strip them only when encoding has already failed
+        return _encode(_strip_surrogates(obj))
+
+def loads_json(data):
+    """
+    Parse a JSON document, such as an inbound webhook body.
+    
+    Uses orjson when it is installed, which parses bytes directly without
+    decoding them to a str first.
+    
+    Args:
+        data (bytes or str): The JSON text
+        
+    Returns:
+        The parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _encode(obj):
+    """Encode obj to compact JSON bytes with orjson or the stdlib fallback."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def _strip_surrogates(obj):
+    """Return a copy of obj with any unencodable surrogates dropped from its strings."""
+    if isinstance(obj, str):
+        return obj.encode('utf-8', errors='ignore').decode('utf-8')
+    if isinstance(obj, dict):
+        return {key: _strip_surrogates(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_strip_surrogates(value) for value in obj]
+    return obj
+
+# The skill object is identical on every card, so all templates share it
+_SKILL = {
+    "type": "service",
+    "id": "box-video-skill"
+}
+
+@functools.lru_cache(maxsize=8)
+def _card_template(skill_card_type, title_code, title_message):
+    """
+    Return the static part of a Box Skills card, built once per card kind.
+    
+    The returned dict (and the dicts nested in it) is shared between calls and
+    must be treated as read-only; callers spread it into a new card dict.
+    """
+    return {
+        "type": "skill_card",
+        "skill_card_type": skill_card_type,
+        "skill_card_title": {
+            "code": title_code,
+            "message": title_message
+        },
+        "skill": _SKILL
+    }
+
+# JSON Schema for the Box Skills metadata we send. Every card needs the
+# standard fields and text entries; transcript entries also need integer
+# "start" timestamps (seconds) in their "appears" list.
+SKILLS_METADATA_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "required": ["cards"],
+    "properties": {
+        "cards": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["type", "skill_card_type", "skill_card_title", "skill", "invocation", "entries"],
+                "properties": {
+                    "type": {"const": "skill_card"},
+                    "entries": {
+                        "type": "array",
+                        "items": {"type": "object", "required": ["text"]}
+                    }
+                },
+                "if": {"properties": {"skill_card_type": {"const": "transcript"}}},
+                "then": {
+                    "properties": {
+                        "entries": {
+                            "items": {
+                                "required": ["appears"],
+                                "properties": {
+                                    "appears": {
+                                        "type": "array",
+                                        "items": {
+                                            "type": "object",
+                                            "required": ["start"],
+                                            "properties": {"start": {"type": "integer"}}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+# Compiled once at import; validation is then a single generated function call
+_validate_skills_metadata = fastjsonschema.compile(SKILLS_METADATA_SCHEMA)
+
+# Static part of every error card, shared between calls (read-only)
+_ERROR_CARD = {
+    **_card_template("status", "processing-error", "Processing Error"),
+    "status": {
+        "code": "error",
+        "message": "An error occurred while processing this file"
+    }
+}
+
+def create_error_card(error_message, invocation_id=None):
     """
     Create a simple error card that can be displayed in Box.
     
+    The card shape is fixed and checked once at import, so it is not
+    re-validated on every call.
+    
     Args:
         error_message (str): The error message to display
+        invocation_id (str): Optional invocation ID, will generate one if not provided
         
     Returns:
         dict: A valid Box Skills card showing the error
     """
-    invocation_id = f"box-video-skill-{int(time.time())}"
+    invocation_id = invocation_id or new_invocation_id()
     
-    error_metadata = {
+    return {
         "cards": [
             {
-                "type": "skill_card",
-                "skill_card_type": "status",
-                "status": {
-                    "code": "error",
-                    "message": "An error occurred while processing this file"
-                },
-                "skill_card_title": {
-                    "code": "processing-error",
-                    "message": "Processing Error"
-                },
-                "skill": {
-                    "type": "service",
-                    "id": "box-video-skill"
-                },
+                **_ERROR_CARD,
                 "invocation": {
                     "type": "skill_invocation",
                     "id": invocation_id
@@ -44,48 +214,12 @@ def create_error_card(error_message):
             }
         ]
     }
-    
-    # Validate the error card (it should always be valid)
-    is_valid, validation_msg = validate_metadata(error_metadata)
-    if not is_valid:
-        # If somehow our error card is invalid, create an even simpler one
-        return {
-            "cards": [
-                {
-                    "type": "skill_card",
-                    "skill_card_type": "status",
-                    "status": {
-                        "code": "error",
-                        "message": "System Error"
-                    },
-                    "skill_card_title": {
-                        "code": "system-error",
-                        "message": "System Error"
-                    },
-                    "skill": {
-                        "type": "service",
-                        "id": "box-video-skill"
-                    },
-                    "invocation": {
-                        "type": "skill_invocation",
-                        "id": invocation_id
-                    },
-                    "entries": [
-                        {
-                            "type": "text",
-                            "text": "Critical error occurred while processing this file."
-                        }
-                    ]
-                }
-            ]
-        }
-    
-    return error_metadata
 
 def validate_metadata(metadata):
     """
     Validate that the metadata follows Box Skills format requirements.
-    SIMPLIFIED for transcript-only debugging.
+    
+    Uses the validator compiled from SKILLS_METADATA_SCHEMA at import time.
     
     Args:
         metadata (dict): The metadata to validate
@@ -94,83 +228,16 @@ def validate_metadata(metadata):
         tuple: (bool, str) - (is_valid, error_message)
     """
     try:
-        print("🔍 Validating metadata structure...")
-        
-        # Check top-level structure
-        if not isinstance(metadata, dict):
-            return False, "Metadata must be a dictionary"
-            
-        if "cards" not in metadata:
-            return False, "Metadata must have a 'cards' key"
-            
-        if not isinstance(metadata["cards"], list):
-            return False, "The 'cards' value must be a list"
-            
-        print(f"✅ Top-level structure valid. Found {len(metadata['cards'])} cards")
-            
-        # Check each card - SIMPLIFIED for transcript only
-        for i, card in enumerate(metadata["cards"]):
-            print(f"🔍 Validating card {i+1}...")
-            
-            # Check required card fields
-            if "type" not in card or card["type"] != "skill_card":
-                return False, f"Card {i+1} must have type: 'skill_card'"
-                
-            if "skill_card_type" not in card:
-                return False, f"Card {i+1} missing 'skill_card_type'"
-                
-            # Allow transcript, text, and status cards (for summary and errors)
-            allowed_types = ["transcript", "text", "status"]
-            if card["skill_card_type"] not in allowed_types:
-                print(f"⚠️  Unsupported card type: {card['skill_card_type']}")
-                print(f"⚠️  Allowed types: {allowed_types}")
-                # Allow it but warn
-                
-            if "skill_card_title" not in card:
-                return False, f"Card {i+1} missing 'skill_card_title'"
-                
-            # Check skill and invocation on each card
-            if "skill" not in card:
-                return False, f"Card {i+1} must have a 'skill' object"
-                
-            if "invocation" not in card:
-                return False, f"Card {i+1} must have an 'invocation' object"
-                
-            if "entries" not in card:
-                return False, f"Card {i+1} missing 'entries'"
-                
-            if not isinstance(card["entries"], list):
-                return False, f"Card {i+1} 'entries' must be a list"
-                
-            print(f"✅ Card {i+1} basic structure valid. Checking {len(card['entries'])} entries...")
-                
-            # Check entries - SIMPLIFIED for transcript
-            for j, entry in enumerate(card["entries"]):
-                if "text" not in entry:
-                    return False, f"Entry {j+1} in card {i+1} missing 'text' field"
-                    
-                # Only check transcript-specific fields for transcript cards
-                if card["skill_card_type"] == "transcript":
-                    if "appears" not in entry:
-                        return False, f"Transcript entry {j+1} missing 'appears' field"
-                    if not isinstance(entry["appears"], list):
-                        return False, f"Transcript entry {j+1} 'appears' must be a list"
-                    for timestamp in entry["appears"]:
-                        if "start" not in timestamp:
-                            return False, f"Transcript entry {j+1} has invalid timestamp format - missing 'start'"
-                        if not isinstance(timestamp["start"], int):
-                            return False, f"Transcript entry {j+1} 'start' timestamp must be an integer (seconds)"
-            
-            print(f"✅ Card {i+1} entries valid")
-        
-        print("✅ All validation checks passed!")
+        _validate_skills_metadata(metadata)
         return True, ""
-        
-    except Exception as e:
-        print(f"❌ Validation exception: {str(e)}")
-        return False, f"Validation error: {str(e)}"
+    except fastjsonschema.JsonSchemaException as e:
+        return False, e.message
 
-def format_metadata(transcript_data, keywords=None, summary=None):
+# The error card is the fallback for every failure, so make sure its fixed
+# shape is valid once at import time
+assert validate_metadata(create_error_card("startup check"))[0], "Error card template is invalid"
+
+def format_metadata(transcript_data, keywords=None, summary=None, invocation_id=None):
     """
     Format transcript data into Box Skills metadata format.
     Supports TRANSCRIPT and SUMMARY cards.
@@ -181,6 +248,7 @@ def format_metadata(transcript_data, keywords=None, summary=None):
             - segments (list): List of segments with timestamps and text
         keywords (list): COMMENTED OUT - List of extracted keywords/phrases
         summary (str): Generated summary of the transcript (optional)
+        invocation_id (str): Optional invocation ID, will generate one if not provided
         
     Returns:
         dict: Box Skills metadata format with transcript card and optional summary card
@@ -189,62 +257,25 @@ def format_metadata(transcript_data, keywords=None, summary=None):
         ValueError: If the generated metadata is invalid and error card creation also fails
     """
     try:
-        print(f"📝 Creating transcript card with {len(transcript_data.get('segments', []))} segments")
+        logger.debug("📝 Creating transcript card with %d segments", len(transcript_data.get('segments', [])))
         
-        # Create transcript entries - USE ALL SEGMENTS as requested
-        transcript_entries = []
-        max_timestamp = 0
+        # Generate a unique invocation ID unless the caller shares one
+        invocation_id = invocation_id or new_invocation_id()
+        logger.debug("🔧 Using invocation ID: %s", invocation_id)
         
-        for i, segment in enumerate(transcript_data["segments"]):
-            # Sanitize text but don't truncate too aggressively
-            text = segment["text"].strip()
-            # Remove any problematic characters
-            text = text.encode('utf-8', errors='ignore').decode('utf-8')
-            
-            start_time = int(segment["start"])
-            max_timestamp = max(max_timestamp, start_time)
-            
-            entry = {
-                "text": text,
-                "appears": [{
-                    "start": start_time  # Box API uses seconds as integers
-                }]
-            }
-            
-            transcript_entries.append(entry)
-            print(f"  Entry {i+1}: '{text[:50]}...' at {start_time}s")
-
-        print(f"📊 Total entries created: {len(transcript_entries)}")
-        print(f"📊 Duration: {max_timestamp} seconds ({max_timestamp // 60}:{max_timestamp % 60:02d})")
-
-        # Generate a unique invocation ID
-        invocation_id = f"box-video-skill-{int(time.time())}"
-        print(f"🔧 Using invocation ID: {invocation_id}")
-
         # Build MINIMAL metadata in Box Skills format - TRANSCRIPT CARD ONLY
+        transcript_card = _build_transcript_card(transcript_data, {
+            "type": "skill_invocation",
+            "id": invocation_id
+        })
         metadata = {
-            "cards": [
-                {
-                    "type": "skill_card",
-                    "skill_card_type": "transcript", 
-                    "skill_card_title": {
-                        "code": "transcript",
-                        "message": "Transcript"
-                    },
-                    "skill": {
-                        "type": "service",
-                        "id": "box-video-skill"
-                    },
-                    "invocation": {
-                        "type": "skill_invocation",
-                        "id": invocation_id
-                    },
-                    "duration": max_timestamp,  # Add total duration in seconds
-                    "entries": transcript_entries
-                }
-            ]
+            "cards": [transcript_card]
         }
         
+        max_timestamp = transcript_card["duration"]
+        logger.debug("📊 Total entries created: %d", len(transcript_card['entries']))
+        logger.debug("📊 Duration: %d seconds (%d:%02d)", max_timestamp, max_timestamp // 60, max_timestamp % 60)
+        
         # TEMPORARILY COMMENTED OUT - Add summary card if summary is provided
         # Will upload summary separately to avoid Box API 500 errors
         """
@@ -296,28 +327,53 @@ def format_metadata(transcript_data, keywords=None, summary=None):
                 }
         """
         
-        print(f"✅ Created metadata with {len(metadata['cards'])} card(s)")
-        print(f"   Card 1: {metadata['cards'][0]['skill_card_type']} with {len(metadata['cards'][0]['entries'])} entries")
-        
-        # Log additional cards if present
-        for i in range(1, len(metadata['cards'])):
-            card = metadata['cards'][i]
-            print(f"   Card {i+1}: {card['skill_card_type']} with {len(card['entries'])} entries")
+        logger.debug("✅ Created metadata with %d card(s)", len(metadata['cards']))
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, card in enumerate(metadata['cards']):
+                logger.debug("   Card %d: %s with %d entries", i + 1, card['skill_card_type'], len(card['entries']))
         
-        # Validate the metadata before returning
-        is_valid, error_msg = validate_metadata(metadata)
-        if not is_valid:
-            print(f"❌ Validation failed: {error_msg}")
-            error_details = f"Metadata validation failed: {error_msg}"
-            return create_error_card(error_details)
-
-        print("✅ Metadata validation passed")
+        # Validate the metadata before returning (dropped entirely under python -O)
+        if __debug__ and VALIDATE_OUTGOING:
+            is_valid, error_msg = validate_metadata(metadata)
+            if not is_valid:
+                logger.warning("❌ Validation failed: %s", error_msg)
+                error_details = f"Metadata validation failed: {error_msg}"
+                return create_error_card(error_details, invocation_id)
+
+            logger.debug("✅ Metadata validation passed")
         return metadata
         
     except Exception as e:
-        print(f"❌ Exception in format_metadata: {str(e)}")
-        return create_error_card(f"Error formatting metadata: {str(e)}")
+        logger.error("❌ Exception in format_metadata: %s", e)
+        return create_error_card(f"Error formatting metadata: {str(e)}", invocation_id)
+
 
+def _build_transcript_card(transcript_data, invocation):
+    """
+    Build the transcript card with one entry per Whisper segment.
+    
+    Args:
+        transcript_data (dict): Transcript data with segments
+        invocation (dict): The skill_invocation object for this run
+        
+    Returns:
+        dict: The transcript card
+    """
+    # Use all segments; Box API uses seconds as integers for timestamps
+    segments = transcript_data["segments"]
+    transcript_entries = [
+        {"text": segment["text"].strip(), "appears": [{"start": int(segment["start"])}]}
+        for segment in segments
+    ]
+    # Whisper returns segments in time order, so the last one starts latest
+    max_timestamp = transcript_entries[-1]["appears"][0]["start"] if transcript_entries else 0
+    
+    return {
+        **_card_template("transcript", "transcript", "Transcript"),
+        "invocation": invocation,
+        "duration": max_timestamp,  # Add total duration in seconds
+        "entries": transcript_entries
+    }
 
 def create_summary_card(summary, invocation_id=None):
     """
@@ -331,21 +387,12 @@ def create_summary_card(summary, invocation_id=None):
         dict: Box Skills metadata format with single summary card
     """
     if not invocation_id:
-        invocation_id = f"box-video-skill-{int(time.time())}"
+        invocation_id = new_invocation_id()
     
     return {
         "cards": [
             {
-                "type": "skill_card",
-                "skill_card_type": "status",
-                "skill_card_title": {
-                    "code": "summary",
-                    "message": "Summary"
-                },
-                "skill": {
-                    "type": "service",
-                    "id": "box-video-skill"
-                },
+                **_card_template("status", "summary", "Summary"),
                 "invocation": {
                     "type": "skill_invocation",
                     "id": invocation_id
@@ -358,51 +405,65 @@ def create_summary_card(summary, invocation_id=None):
         ]
     }
 
-def create_processing_info_card(transcript_info=None, summary_info=None, file_duration=None, invocation_id=None):
+# Line templates for each section of the AI Processing Details message
+_TRANSCRIPTION_LINES = (
+    "🎤 TRANSCRIPTION",
+    "  Service: {service}",
+    "  Model: {model}",
+    "  Processing time: {processing_time}s",
+    "  File size: {file_size_mb}MB",
+    ""
+)
+_SUMMARY_LINES = (
+    "📝 SUMMARY GENERATION",
+    "  Service: {service}",
+    "  Model: {model}",
+    "  Processing time: {processing_time}s",
+    "  Input text: {input_length_k}k characters",
+    ""
+)
+_KEYWORDS_LINES = (
+    "🏷️ KEYWORD EXTRACTION",
+    "  Service: {service}",
+    "  Model: {model}",
+    "  Processing time: {processing_time}s",
+    "  Input text: {input_length_k}k characters",
+    ""
+)
+
+def _format_section(lines, info):
+    """Fill one section's line templates from a processing_info dict."""
+    values = {
+        "service": info.get('service', 'Unknown'),
+        "model": info.get('model', 'Unknown'),
+        "processing_time": info.get('processing_time', 0),
+        "file_size_mb": round(info.get('file_size', 0) / 1024 / 1024, 2),
+        "input_length_k": round(info.get('input_length', 0) / 1000, 1)
+    }
+    return [line.format_map(values) for line in lines]
+
+def _build_ai_details(transcript_info, summary_info, keywords_info, file_duration):
     """
-    Create a processing information card that shows details about the AI services used.
+    Build the message text for the AI Processing Details card.
     
     Args:
         transcript_info (dict): Processing info from transcription
         summary_info (dict): Processing info from summary generation
+        keywords_info (dict): Processing info from keyword extraction
         file_duration (float): Duration of the audio file in seconds
-        invocation_id (str): Optional invocation ID, will generate one if not provided
         
     Returns:
-        dict: Box Skills metadata format with processing info status card
+        str: The multi-line details message
     """
-    if not invocation_id:
-        invocation_id = f"box-video-skill-{int(time.time())}"
-    
-    # Build processing details message with simple text formatting
     details = []
+    total_time = 0
     
-    if transcript_info:
-        file_size_mb = round(transcript_info.get('file_size', 0) / 1024 / 1024, 2)
-        details.append("🎤 TRANSCRIPTION")
-        details.append(f"  Service: {transcript_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {transcript_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {transcript_info.get('processing_time', 0)}s")
-        details.append(f"  File size: {file_size_mb}MB")
-        details.append("")  # Empty line for spacing
-        
-    if summary_info:
-        input_length_k = round(summary_info.get('input_length', 0) / 1000, 1)
-        details.append("📝 SUMMARY GENERATION")
-        details.append(f"  Service: {summary_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {summary_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {summary_info.get('processing_time', 0)}s")
-        details.append(f"  Input text: {input_length_k}k characters")
-        details.append("")
-        
-    if keywords_info:
-        input_length_k = round(keywords_info.get('input_length', 0) / 1000, 1)
-        details.append("🏷️ KEYWORD EXTRACTION")
-        details.append(f"  Service: {keywords_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {keywords_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {keywords_info.get('processing_time', 0)}s")
-        details.append(f"  Input text: {input_length_k}k characters")
-        details.append("")
+    for lines, info in ((_TRANSCRIPTION_LINES, transcript_info),
+                        (_SUMMARY_LINES, summary_info),
+                        (_KEYWORDS_LINES, keywords_info)):
+        if info:
+            details.extend(_format_section(lines, info))
+            total_time += info.get('processing_time', 0)
     
     # File and performance summary
     details.append("📊 PERFORMANCE SUMMARY")
@@ -412,14 +473,6 @@ def create_processing_info_card(transcript_info=None, summary_info=None, file_du
         duration_sec = int(file_duration % 60)
         details.append(f"  Audio duration: {duration_min}:{duration_sec:02d}")
     
-    total_time = 0
-    if transcript_info:
-        total_time += transcript_info.get('processing_time', 0)
-    if summary_info:
-        total_time += summary_info.get('processing_time', 0)
-    if keywords_info:
-        total_time += keywords_info.get('processing_time', 0)
-    
     if total_time > 0:
         details.append(f"  Total AI processing: {round(total_time, 2)}s")
         
@@ -430,21 +483,31 @@ def create_processing_info_card(transcript_info=None, summary_info=None, file_du
     details.append("")
     details.append("✅ Processing completed successfully!")
     
-    message = "\n".join(details) if details else "Processing completed successfully"
+    return "\n".join(details)
+
+def create_processing_info_card(transcript_info=None, summary_info=None, file_duration=None, invocation_id=None, keywords_info=None):
+    """
+    Create a processing information card that shows details about the AI services used.
+    
+    Args:
+        transcript_info (dict): Processing info from transcription
+        summary_info (dict): Processing info from summary generation
+        file_duration (float): Duration of the audio file in seconds
+        invocation_id (str): Optional invocation ID, will generate one if not provided
+        keywords_info (dict): Processing info from keyword extraction
+        
+    Returns:
+        dict: Box Skills metadata format with processing info status card
+    """
+    if not invocation_id:
+        invocation_id = new_invocation_id()
+    
+    message = _build_ai_details(transcript_info, summary_info, keywords_info, file_duration)
     
     return {
         "cards": [
             {
-                "type": "skill_card",
-                "skill_card_type": "status",
-                "skill_card_title": {
-                    "code": "processing_info",
-                    "message": "🤖 AI Processing Details"
-                },
-                "skill": {
-                    "type": "service",
-                    "id": "box-video-skill"
-                },
+                **_card_template("status", "processing_info", "🤖 AI Processing Details"),
                 "invocation": {
                     "type": "skill_invocation",
                     "id": invocation_id
@@ -475,178 +538,48 @@ def create_all_cards(transcript_data, summary, keywords, transcript_info, summar
         dict: Box Skills metadata format with all cards in desired order
     """
     if not invocation_id:
-        invocation_id = f"box-video-skill-{int(time.time())}"
+        invocation_id = new_invocation_id()
+    
+    # All cards from one run share a single invocation object
+    invocation = {
+        "type": "skill_invocation",
+        "id": invocation_id
+    }
     
     all_cards = []
     
     # 1. Summary card (appears first)
-    if summary and summary.strip():
+    if summary and (summary_text := summary.strip()):
         summary_card = {
-            "type": "skill_card",
-            "skill_card_type": "status",
-            "skill_card_title": {
-                "code": "summary",
-                "message": "Summary"
-            },
-            "skill": {
-                "type": "service",
-                "id": "box-video-skill"
-            },
-            "invocation": {
-                "type": "skill_invocation",
-                "id": invocation_id
-            },
+            **_card_template("status", "summary", "Summary"),
+            "invocation": invocation,
             "status": {
                 "code": "success",
-                "message": summary.strip()
+                "message": summary_text
             }
         }
         all_cards.append(summary_card)
     
     # 2. Keywords card (appears second)
-    if keywords and len(keywords) > 0:
-        keyword_entries = []
-        for keyword in keywords:
-            if keyword.strip():  # Only add non-empty keywords
-                keyword_entries.append({
-                    "text": keyword.strip()
-                })
-        
-        if keyword_entries:  # Only add card if we have valid keywords
-            keywords_card = {
-                "type": "skill_card",
-                "skill_card_type": "keyword",
-                "skill_card_title": {
-                    "code": "keywords",
-                    "message": "Keywords"
-                },
-                "skill": {
-                    "type": "service",
-                    "id": "box-video-skill"
-                },
-                "invocation": {
-                    "type": "skill_invocation",
-                    "id": invocation_id
-                },
-                "entries": keyword_entries
-            }
-            all_cards.append(keywords_card)
-    
-    # 3. Transcript card (appears third)
-    transcript_entries = []
-    max_timestamp = 0
-    
-    for i, segment in enumerate(transcript_data["segments"]):
-        # Sanitize text but don't truncate too aggressively
-        text = segment["text"].strip()
-        # Remove any problematic characters
-        text = text.encode('utf-8', errors='ignore').decode('utf-8')
-        
-        start_time = int(segment["start"])
-        max_timestamp = max(max_timestamp, start_time)
-        
-        entry = {
-            "text": text,
-            "appears": [{
-                "start": start_time  # Box API uses seconds as integers
-            }]
+    # Only add the card if at least one keyword is non-empty
+    if keywords and (keyword_entries := [{"text": text} for keyword in keywords if (text := keyword.strip())]):
+        keywords_card = {
+            **_card_template("keyword", "keywords", "Keywords"),
+            "invocation": invocation,
+            "entries": keyword_entries
         }
-        
-        transcript_entries.append(entry)
+        all_cards.append(keywords_card)
     
-    transcript_card = {
-        "type": "skill_card",
-        "skill_card_type": "transcript", 
-        "skill_card_title": {
-            "code": "transcript",
-            "message": "Transcript"
-        },
-        "skill": {
-            "type": "service",
-            "id": "box-video-skill"
-        },
-        "invocation": {
-            "type": "skill_invocation",
-            "id": invocation_id
-        },
-        "duration": max_timestamp,  # Add total duration in seconds
-        "entries": transcript_entries
-    }
-    all_cards.append(transcript_card)
+    # 3. Transcript card (appears third)
+    all_cards.append(_build_transcript_card(transcript_data, invocation))
     
     # 4. AI Processing details card (appears last)
-    details = []
-    
-    if transcript_info:
-        file_size_mb = round(transcript_info.get('file_size', 0) / 1024 / 1024, 2)
-        details.append("🎤 TRANSCRIPTION")
-        details.append(f"  Service: {transcript_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {transcript_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {transcript_info.get('processing_time', 0)}s")
-        details.append(f"  File size: {file_size_mb}MB")
-        details.append("")
-        
-    if summary_info:
-        input_length_k = round(summary_info.get('input_length', 0) / 1000, 1)
-        details.append("📝 SUMMARY GENERATION")
-        details.append(f"  Service: {summary_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {summary_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {summary_info.get('processing_time', 0)}s")
-        details.append(f"  Input text: {input_length_k}k characters")
-        details.append("")
-        
-    if keywords_info:
-        input_length_k = round(keywords_info.get('input_length', 0) / 1000, 1)
-        details.append("🏷️ KEYWORD EXTRACTION")
-        details.append(f"  Service: {keywords_info.get('service', 'Unknown')}")
-        details.append(f"  Model: {keywords_info.get('model', 'Unknown')}")
-        details.append(f"  Processing time: {keywords_info.get('processing_time', 0)}s")
-        details.append(f"  Input text: {input_length_k}k characters")
-        details.append("")
-    
-    details.append("📊 PERFORMANCE SUMMARY")
-    
-    if file_duration:
-        duration_min = int(file_duration // 60)
-        duration_sec = int(file_duration % 60)
-        details.append(f"  Audio duration: {duration_min}:{duration_sec:02d}")
-    
-    total_time = 0
-    if transcript_info:
-        total_time += transcript_info.get('processing_time', 0)
-    if summary_info:
-        total_time += summary_info.get('processing_time', 0)
-    if keywords_info:
-        total_time += keywords_info.get('processing_time', 0)
-    
-    if total_time > 0:
-        details.append(f"  Total AI processing: {round(total_time, 2)}s")
-        
-        if file_duration and total_time < file_duration:
-            efficiency = round((file_duration / total_time), 1)
-            details.append(f"  Efficiency: {efficiency}x faster than real-time ⚡")
-    
-    details.append("")
-    details.append("✅ Processing completed successfully!")
-    
     ai_details_card = {
-        "type": "skill_card",
-        "skill_card_type": "status",
-        "skill_card_title": {
-            "code": "processing_info",
-            "message": "🤖 AI Processing Details"
-        },
-        "skill": {
-            "type": "service",
-            "id": "box-video-skill"
-        },
-        "invocation": {
-            "type": "skill_invocation",
-            "id": invocation_id
-        },
+        **_card_template("status", "processing_info", "🤖 AI Processing Details"),
+        "invocation": invocation,
         "status": {
             "code": "success",
-            "message": "\n".join(details)
+            "message": _build_ai_details(transcript_info, summary_info, keywords_info, file_duration)
         }
     }
     all_cards.append(ai_details_card)
@@ -688,7 +621,7 @@ def test_formatter():
         
         # Print formatted metadata
         print("\nFormatted Box Skills Metadata:")
-        print(json.dumps(metadata, indent=2))
+        print(dumps_pretty(metadata))
         
         # Check if this is an error card
         if len(metadata["cards"]) == 1 and metadata["cards"][0]["skill_card_title"]["message"] == "Processing Error":
@@ -706,4 +639,4 @@ if __name__ == "__main__":
     # Test error card generation
     print("\nTesting error card generation:")
     error_card = create_error_card("Test error message")
-    print(json.dumps(error_card, indent=2))
+    print(dumps_pretty(error_card))
@@ -1,26 +1,298 @@
 # Placeholder for Whisper transcription logic
 
 import os
+import io
 import time
-from openai import OpenAI
+import json
+import asyncio
+import contextlib
+import hashlib
+import threading
+import operator
+import queue
+import sqlite3
+from pathlib import Path
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIError
+
+try:
+    from blake3 import blake3
+except ImportError:  # blake3 is optional; fall back to hashlib's blake2b
+    blake3 = None
+
+# Key prefixes accepted by validate_api_key
+_VALID_PREFIXES = ('sk-proj-', 'sk-None-', 'sk-svcacct-')
+
+# Fetches (start, end, text) from a Whisper segment in one call
+_segment_fields = operator.attrgetter('start', 'end', 'text')
+
+# "openai" sends audio to the hosted whisper-1 model; "local" runs it through
+# faster-whisper (CTranslate2) on this machine, which must then be installed
+BACKEND = os.environ.get('WHISPER_BACKEND', 'openai')
+LOCAL_MODEL = os.environ.get('WHISPER_LOCAL_MODEL', 'large-v3')
+LOCAL_DEVICE = os.environ.get('WHISPER_LOCAL_DEVICE', 'auto')
+# Unset picks int8_float16 on a GPU and int8 on CPU, which can't run float16
+LOCAL_COMPUTE_TYPE = os.environ.get('WHISPER_LOCAL_COMPUTE_TYPE')
+LOCAL_BATCH_SIZE = 16
+
+# Optional on-disk cache of transcripts keyed by a hash of the audio, so a
+# file that is processed again skips the Whisper call; disabled when unset.
+# Entries live in a SQLite database in this directory and survive restarts
+CACHE_DIR = os.environ.get('WHISPER_CACHE_DIR')
+CACHE_MAX_BYTES = int(os.environ.get('WHISPER_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Retries for rate limits, timeouts, connection errors and 5xx responses; the
+# SDK backs off exponentially with jitter and honors Retry-After between attempts
+MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '5'))
+
+# Default number of simultaneous Whisper uploads for the batch helpers
+WHISPER_CONCURRENCY = int(os.environ.get('WHISPER_CONCURRENCY', '8'))
+
+class TranscriptionError(Exception):
+    """
+    Raised when Whisper or the audio file fails during transcription.
+    
+    The original API or I/O error is kept as __cause__, so callers can check
+    for RateLimitError and the like before deciding to retry.
+    """
 
 def validate_api_key(api_key):
     """Validate that the API key has a valid format."""
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables")
         
-    valid_prefixes = ['sk-proj-', 'sk-None-', 'sk-svcacct-']
-    if not any(api_key.startswith(prefix) for prefix in valid_prefixes):
+    if not api_key.startswith(_VALID_PREFIXES):
         raise ValueError("Invalid OpenAI API key format")
     
     return True
 
-def transcribe_audio(audio_path):
+# OpenAI clients by API key, built on first use
+_clients = {}
+_client_lock = threading.Lock()
+
+def _get_client(api_key):
+    """Validate the key and build an OpenAI client, reused for every later call with it."""
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+    
+    # Concurrent jobs and warm_up() can race here on a cold start; build only one
+    # client, so the connection warm_up() opens is the one the upload uses
+    with _client_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            validate_api_key(api_key)
+            
+            # Keep idle connections for a minute instead of httpx's 5 seconds, so the
+            # one opened by warm_up() is still there when the upload starts
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=100,
+                    keepalive_expiry=60.0
+                ),
+                timeout=600.0  # long uploads; the SDK's own default
+            )
+            client = OpenAI(api_key=api_key, http_client=http_client, max_retries=MAX_RETRIES)
+            _clients[api_key] = client
+    
+    return client
+
+def _reset_clients_after_fork():
+    """Drop the parent's clients and lock in a forked child so it opens its own connections."""
+    global _clients, _client_lock
+    _clients = {}
+    _client_lock = threading.Lock()
+
+# A forked worker must not share the parent's pooled connections
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+def warm_up():
+    """
+    Open a connection to the OpenAI API in the background.
+    
+    Call this only when a single upload is about to run, so the DNS lookup
+    and TLS handshake overlap the cache lookup and file read. Chunked files
+    open several connections at once, so one warm connection saves little,
+    and silent audio is never uploaded. Idle connections are dropped after
+    60 seconds, so warming at import time would not help. Does nothing for
+    the local backend, without a valid key, or when OPENAI_SKIP_WARMUP is set.
+    """
+    if BACKEND == 'local' or os.environ.get('OPENAI_SKIP_WARMUP'):
+        return
+    
+    try:
+        client = _get_client(os.environ.get('OPENAI_API_KEY'))
+    except ValueError:
+        return
+    
+    def _ping():
+        try:
+            client.with_options(max_retries=0, timeout=10).models.list()
+        except Exception:
+            # Only the open connection matters, not the response
+            pass
+    
+    threading.Thread(target=_ping, name="whisper-warm-up", daemon=True).start()
+
+def _upload_file(audio):
+    """
+    Prepare audio for the Whisper upload.
+    
+    Args:
+        audio (str or bytes): Path to an audio file, or MP3 bytes already in memory
+        
+    Returns:
+        tuple: (file argument for the SDK, size in bytes)
+    """
+    if isinstance(audio, (bytes, bytearray)):
+        # Whisper infers the format from the file name, so give in-memory audio one
+        return ("audio.mp3", bytes(audio)), len(audio)
+    return Path(audio), os.path.getsize(audio)
+
+def _cache_key(audio, response_format='verbose_json'):
+    """
+    Hash the audio content together with the model and response format.
+    
+    Uses BLAKE3 when it is installed, which hashes large files on several
+    cores with SIMD and is much faster than blake2b. The two produce
+    different keys, so switching between them only costs cache misses.
+    """
+    model = LOCAL_MODEL if BACKEND == 'local' else 'whisper-1'
+    
+    if blake3 is not None:
+        digest = blake3(max_threads=blake3.AUTO)
+        if isinstance(audio, (bytes, bytearray)):
+            digest.update(audio)
+        else:
+            digest.update_mmap(audio)
+        return f"b3-{digest.hexdigest(16)}-{model}-{response_format}"
+    
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(audio, (bytes, bytearray)):
+        digest.update(audio)
+    else:
+        with open(audio, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return f"{digest.hexdigest()}-{model}-{response_format}"
+
+# Hits refresh an entry's last-use time at most this often, so most cache
+# reads don't turn into writes
+_CACHE_TOUCH_SECONDS = 60
+
+# Eviction trims the cache to this share of the limit, so it runs once per
+# batch of writes rather than on every write near the limit
+_CACHE_EVICT_TO = 0.9
+
+# One cache connection per thread; sqlite3 connections are not shared across threads
+_cache_local = threading.local()
+
+def _reset_cache_connections():
+    """Drop connections inherited from the parent process after a fork."""
+    global _cache_local
+    _cache_local = threading.local()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_cache_connections)
+
+def _cache_db():
+    """Open this thread's connection to the cache database, creating it on first use."""
+    conn = getattr(_cache_local, 'conn', None)
+    if conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Autocommit mode; writes open their own immediate transactions
+        conn = sqlite3.connect(os.path.join(CACHE_DIR, 'whisper-cache.sqlite3'), timeout=10, isolation_level=None)
+        conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA mmap_size=268435456;
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_hit REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_last_hit ON cache (last_hit);
+            
+            -- Running total of payload bytes, kept by triggers so a write can
+            -- check the size limit without summing the table
+            CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 1), total INTEGER NOT NULL);
+            INSERT OR IGNORE INTO cache_size VALUES (1, (SELECT COALESCE(SUM(bytes), 0) FROM cache));
+            CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache
+                BEGIN UPDATE cache_size SET total = total + new.bytes; END;
+            CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE OF bytes ON cache
+                BEGIN UPDATE cache_size SET total = total + new.bytes - old.bytes; END;
+            CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache
+                BEGIN UPDATE cache_size SET total = total - old.bytes; END;
+        """)
+        _cache_local.conn = conn
+    return conn
+
+def _cache_get(key, start_time):
+    """Load a cached transcript, or return None on a miss."""
+    try:
+        conn = _cache_db()
+        row = conn.execute("SELECT payload, last_hit FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        payload, last_hit = row
+        # Mark the entry as recently used for eviction, unless it already is
+        now = time.time()
+        if now - last_hit > _CACHE_TOUCH_SECONDS:
+            conn.execute("UPDATE cache SET last_hit = ? WHERE key = ?", (now, key))
+        result = json.loads(payload)
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+    
+    result["processing_info"]["processing_time"] = round(time.time() - start_time, 2)
+    result["processing_info"]["cached"] = True
+    return result
+
+def _cache_put(key, result):
+    """Store a transcript, then evict least recently used entries over the size limit."""
+    payload = json.dumps(result).encode('utf-8')
+    try:
+        conn = _cache_db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete
+            # would bypass the size triggers
+            conn.execute("""
+                INSERT INTO cache (key, payload, bytes, last_hit) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    payload = excluded.payload, bytes = excluded.bytes, last_hit = excluded.last_hit
+            """, (key, payload, len(payload), time.time()))
+            
+            total = conn.execute("SELECT total FROM cache_size").fetchone()[0]
+            if total > CACHE_MAX_BYTES:
+                # Keep the most recently used entries that fit below the low-water mark
+                conn.execute("""
+                    DELETE FROM cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(bytes) OVER (ORDER BY last_hit DESC) AS running FROM cache
+                        ) WHERE running > ?
+                    )
+                """, (int(CACHE_MAX_BYTES * _CACHE_EVICT_TO),))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+    except (sqlite3.Error, OSError):
+        # The cache is best effort; the transcript is still returned
+        pass
+
+def transcribe_audio(audio_path, with_segments=True):
     """
     Transcribe an audio file using OpenAI's Whisper API.
     
     Args:
-        audio_path (str): Path to the audio file (MP3 format)
+        audio_path (str or bytes): Path to the audio file, or MP3 bytes in memory
+        with_segments (bool): Request segment timestamps. Without them Whisper
+            returns plain json, a smaller response that comes back sooner, and
+            segments is empty
         
     Returns:
         dict: Dictionary containing:
@@ -36,52 +308,344 @@ def transcribe_audio(audio_path):
                 - file_size (int): Size of audio file in bytes
     """
     try:
-        # Get file size for metadata
-        file_size = os.path.getsize(audio_path)
-        
         # Start timing
         start_time = time.time()
         
-        # Get and validate API key only when needed
-        api_key = os.environ.get('OPENAI_API_KEY')
-        validate_api_key(api_key)
+        if with_segments:
+            format_args = {"response_format": "verbose_json", "timestamp_granularities": ["segment"]}
+        else:
+            format_args = {"response_format": "json"}
+        
+        # Reuse the transcript if this exact audio was transcribed before
+        key = _cache_key(audio_path, format_args["response_format"]) if CACHE_DIR else None
+        if key:
+            cached = _cache_get(key, start_time)
+            if cached is not None:
+                return cached
         
-        # Initialize client with validated key
-        client = OpenAI(api_key=api_key)
+        # Get the upload and its size for metadata
+        audio_file, file_size = _upload_file(audio_path)
         
-        with open(audio_path, 'rb') as audio_file:
-            # Call Whisper API with timestamps enabled
+        if BACKEND == 'local':
+            result = _transcribe_local(audio_file, file_size, start_time)
+            if key:
+                _cache_put(key, result)
+            return result
+        
+        # Get the cached client for the configured key, validating it on first use
+        client = _get_client(os.environ.get('OPENAI_API_KEY'))
+        
+        with contextlib.ExitStack() as stack:
+            if isinstance(audio_file, Path):
+                # The SDK reads a Path fully into memory; an open file is
+                # passed through to httpx, which streams it from disk
+                audio_file = (audio_file.name, stack.enter_context(open(audio_file, 'rb')))
+            
+            # Call Whisper API, with timestamps when requested
             response = client.audio.transcriptions.create(
                 file=audio_file,
                 model="whisper-1",
-                response_format="verbose_json",
-                timestamp_granularities=["segment"]
+                **format_args
             )
+        
+        # End timing
+        end_time = time.time()
+        processing_time = end_time - start_time
+        
+        result = _build_result(response, processing_time, file_size)
+        if key:
+            _cache_put(key, result)
+        return result
             
-            # End timing
-            end_time = time.time()
-            processing_time = end_time - start_time
+    except (APIError, OSError) as e:
+        # Only API and I/O failures are wrapped; anything else is a bug and surfaces as is
+        raise TranscriptionError(f"Failed to transcribe audio: {str(e)}") from e
+
+# The faster-whisper pipeline, loaded on first use
+_local_pipeline = None
+_local_pipeline_lock = threading.Lock()
+
+def _get_local_pipeline():
+    """Load the faster-whisper model once per process, on first use."""
+    global _local_pipeline
+    
+    if _local_pipeline is not None:
+        return _local_pipeline
+    
+    # Concurrent jobs on a cold start would otherwise each load a copy of the model
+    with _local_pipeline_lock:
+        if _local_pipeline is None:
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
             
-            # Extract full text and segments
-            result = {
-                "text": response.text,
-                "segments": [
-                    {
-                        "start": segment.start,
-                        "end": segment.end,
-                        "text": segment.text
-                    }
-                    for segment in response.segments
-                ],
-                "processing_info": {
-                    "service": "OpenAI Whisper",
-                    "model": "whisper-1",
-                    "processing_time": round(processing_time, 2),
-                    "file_size": file_size
-                }
-            }
+            device = LOCAL_DEVICE
+            if device == 'auto':
+                import ctranslate2
+                device = 'cuda' if ctranslate2.get_cuda_device_count() > 0 else 'cpu'
+            compute_type = LOCAL_COMPUTE_TYPE or ('int8_float16' if device == 'cuda' else 'int8')
             
-            return result
+            model = WhisperModel(LOCAL_MODEL, device=device, compute_type=compute_type)
+            _local_pipeline = BatchedInferencePipeline(model=model)
+    
+    return _local_pipeline
+
+def _reset_local_pipeline_after_fork():
+    """Drop the parent's model and lock in a forked child; GPU contexts don't survive fork."""
+    global _local_pipeline, _local_pipeline_lock
+    _local_pipeline = None
+    _local_pipeline_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_local_pipeline_after_fork)
+
+def _transcribe_local(audio_file, file_size, start_time):
+    """Transcribe with the local faster-whisper backend, returning the same dict as the API path."""
+    if isinstance(audio_file, tuple):
+        source = io.BytesIO(audio_file[1])
+    else:
+        source = str(audio_file)
+    
+    try:
+        # Segments are generated lazily as the model decodes, so consume them here
+        segments, _info = _get_local_pipeline().transcribe(source, batch_size=LOCAL_BATCH_SIZE, word_timestamps=False)
+        segments = [
+            {"start": start, "end": end, "text": text}
+            for start, end, text in map(_segment_fields, segments)
+        ]
+    except (ImportError, RuntimeError, ValueError) as e:
+        # Missing package, unsupported device or compute type, or a decode failure
+        raise TranscriptionError(f"Failed to transcribe audio: {str(e)}") from e
+    
+    return {
+        "text": "".join(segment["text"] for segment in segments).strip(),
+        "segments": segments,
+        "processing_info": {
+            "service": "faster-whisper",
+            "model": LOCAL_MODEL,
+            "processing_time": round(time.time() - start_time, 2),
+            "file_size": file_size
+        }
+    }
+
+def _build_result(response, processing_time, file_size):
+    """Convert a Whisper response into the transcript dict callers expect."""
+    # Extract full text and segments; plain json responses have no segments
+    return {
+        "text": response.text,
+        "segments": [
+            {"start": start, "end": end, "text": text}
+            for start, end, text in map(_segment_fields, getattr(response, 'segments', None) or ())
+        ],
+        "processing_info": {
+            "service": "OpenAI Whisper",
+            "model": "whisper-1",
+            "processing_time": round(processing_time, 2),
+            "file_size": file_size
+        }
+    }
+
+async def transcribe_audio_async(audio_path, client=None, semaphore=None):
+    """
+    Transcribe an audio file with the async OpenAI client.
+    
+    Lets several uploads to Whisper run concurrently on one event loop. Returns
+    the same dictionary as transcribe_audio().
+    
+    Args:
+        audio_path (str or bytes): Path to the audio file, or MP3 bytes in memory
+        client (AsyncOpenAI): Optional client to share between calls; one is created for this call if omitted
+        semaphore (asyncio.Semaphore): Optional semaphore bounding concurrent uploads
+        
+    Returns:
+        dict: Transcript text, segments and processing info (see transcribe_audio)
+    """
+    if BACKEND == 'local':
+        # The model runs in this process; keep inference off the event loop
+        async with (semaphore or asyncio.Semaphore(1)):
+            return await asyncio.to_thread(transcribe_audio, audio_path)
+    
+    if client is None:
+        api_key = os.environ.get('OPENAI_API_KEY')
+        validate_api_key(api_key)
+        async with AsyncOpenAI(api_key=api_key, max_retries=MAX_RETRIES) as owned_client:
+            return await transcribe_audio_async(audio_path, owned_client, semaphore)
+    
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+    
+    try:
+        # Hash and read the cache off the event loop
+        key = None
+        if CACHE_DIR:
+            key = await asyncio.to_thread(_cache_key, audio_path)
+            cached = await asyncio.to_thread(_cache_get, key, time.time())
+            if cached is not None:
+                return cached
+        
+        # Get the upload and its size for metadata
+        audio_file, file_size = _upload_file(audio_path)
+        
+        async with semaphore:
+            start_time = time.time()
             
-    except Exception as e:
-        raise Exception(f"Failed to transcribe audio: {str(e)}") 
\ No newline at end of file
+            # The SDK reads path-like files itself, without blocking the event loop
+            response = await client.audio.transcriptions.create(
+                file=audio_file,
+                model="whisper-1",
+                response_format="verbose_json",
+                timestamp_granularities=["segment"]
+            )
+            
+            processing_time = time.time() - start_time
+        
+        result = _build_result(response, processing_time, file_size)
+        if key:
+            await asyncio.to_thread(_cache_put, key, result)
+        return result
+        
+    except (APIError, OSError) as e:
+        raise TranscriptionError(f"Failed to transcribe audio: {str(e)}") from e
+
+async def transcribe_many(audio_paths, concurrency=WHISPER_CONCURRENCY):
+    """
+    Transcribe several audio files concurrently.
+    
+    All uploads share one async client, and at most `concurrency` run at once to
+    stay within OpenAI rate limits.
+    
+    Args:
+        audio_paths (list): Paths to the audio files, or MP3 bytes
+        concurrency (int): Maximum number of simultaneous transcriptions
+        
+    Returns:
+        list: One transcript dict per path, in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if BACKEND == 'local':
+        return await asyncio.gather(*(transcribe_audio_async(path, semaphore=semaphore) for path in audio_paths))
+    
+    api_key = os.environ.get('OPENAI_API_KEY')
+    validate_api_key(api_key)
+    
+    async with AsyncOpenAI(api_key=api_key, max_retries=MAX_RETRIES) as client:
+        return await asyncio.gather(*(transcribe_audio_async(path, client, semaphore) for path in audio_paths))
+
+def transcribe_audio_batch(audio_paths, concurrency=WHISPER_CONCURRENCY):
+    """
+    Transcribe several audio files concurrently from synchronous code.
+    
+    Runs transcribe_many() on a fresh event loop, so it must not be called
+    from inside a running loop.
+    
+    Args:
+        audio_paths (list): Paths to the audio files, or MP3 bytes
+        concurrency (int): Maximum number of simultaneous transcriptions
+        
+    Returns:
+        list: One transcript dict per path, in input order
+    """
+    return asyncio.run(transcribe_many(audio_paths, concurrency))
+
+def transcribe_chunks(chunks, concurrency=WHISPER_CONCURRENCY):
+    """
+    Transcribe consecutive pieces of one recording concurrently and stitch them together.
+    
+    Used for audio too large for a single Whisper upload. Each piece's segment
+    timestamps are shifted by the piece's offset into the recording.
+    
+    Args:
+        chunks (list): (audio, offset_seconds) pairs in recording order, where
+            audio is a path or MP3 bytes
+        concurrency (int): Maximum number of simultaneous transcriptions
+        
+    Returns:
+        dict: Transcript text, segments and processing info (see transcribe_audio)
+    """
+    start_time = time.time()
+    results = transcribe_audio_batch([audio for audio, _ in chunks], concurrency)
+    first_info = results[0]["processing_info"] if results else {}
+    
+    return {
+        "text": " ".join(result["text"].strip() for result in results),
+        "segments": [
+            {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+            for (_, offset), result in zip(chunks, results)
+            for segment in result["segments"]
+        ],
+        "processing_info": {
+            "service": first_info.get("service", "OpenAI Whisper"),
+            "model": first_info.get("model", "whisper-1"),
+            "processing_time": round(time.time() - start_time, 2),
+            "file_size": sum(result["processing_info"]["file_size"] for result in results),
+            "chunks": len(chunks)
+        }
+    }
+
+async def iter_segments_async(chunks, concurrency=WHISPER_CONCURRENCY):
+    """
+    Yield transcript segments as each piece of a recording finishes transcribing.
+    
+    Pieces are transcribed concurrently and yielded in completion order, not
+    recording order, so callers can show captions before the whole file is
+    done. Pass [(audio, 0.0)] for a single file.
+    
+    Args:
+        chunks (list): (audio, offset_seconds) pairs, where audio is a path or MP3 bytes
+        concurrency (int): Maximum number of simultaneous transcriptions
+        
+    Yields:
+        dict: Segment with start, end (shifted by the piece's offset) and text
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with contextlib.AsyncExitStack() as stack:
+        client = None
+        if BACKEND != 'local':
+            api_key = os.environ.get('OPENAI_API_KEY')
+            validate_api_key(api_key)
+            client = await stack.enter_async_context(AsyncOpenAI(api_key=api_key, max_retries=MAX_RETRIES))
+        
+        async def _transcribe(audio, offset):
+            return offset, await transcribe_audio_async(audio, client, semaphore)
+        
+        for task in asyncio.as_completed([_transcribe(audio, offset) for audio, offset in chunks]):
+            offset, result = await task
+            for segment in result["segments"]:
+                yield {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+
+def transcribe_audio_iter(chunks, concurrency=WHISPER_CONCURRENCY):
+    """
+    Iterate over transcript segments from synchronous code as they become available.
+    
+    Runs iter_segments_async() on an event loop in a background thread and
+    hands segments over through a queue. Stopping early does not cancel
+    transcriptions already in flight.
+    
+    Args:
+        chunks (list): (audio, offset_seconds) pairs, where audio is a path or MP3 bytes
+        concurrency (int): Maximum number of simultaneous transcriptions
+        
+    Yields:
+        dict: Segment with start, end and text, in completion order
+    """
+    items = queue.Queue()
+    done = object()
+    
+    async def _pump():
+        async for segment in iter_segments_async(chunks, concurrency):
+            items.put(segment)
+    
+    def _run():
+        try:
+            asyncio.run(_pump())
+        except BaseException as e:
+            # Re-raised in the consuming thread
+            items.put(e)
+        finally:
+            items.put(done)
+    
+    threading.Thread(target=_run, name="whisper-segments", daemon=True).start()
+    
+    while (item := items.get()) is not done:
+        if isinstance(item, BaseException):
+            raise item
+        yield item